@@ -1,3 +1,6 @@
+import time
+_start_time = time.perf_counter()  # Measures `import app`, reported once initialization finishes
+
 from flask import Flask
 from flask_cors import CORS
 from routes.auth_routes import auth_routes
@@ -8,8 +11,14 @@ from routes.course_routes import course_routes
 from routes.user_routes import user_routes
 from routes.chatbot_routes import chatbot_routes
 from routes.cover_letter_routes import cover_letter_routes
+from routes.metrics_routes import metrics_routes
 from config.db import init_db
+from services.ats_model_service import load_ats_model
+from utils.nltk_resources import preload_nltk_resources
 import os
+import logging
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
@@ -30,6 +39,9 @@ def after_request(response):
 # Initialize MongoDB
 mongo = init_db(app)
 
+# Load the corpus ATS model before workers fork so they share it
+load_ats_model()
+
 # Register all blueprints
 app.register_blueprint(auth_routes, url_prefix="/api/auth")
 app.register_blueprint(resume_routes, url_prefix="/api/resume")
@@ -38,6 +50,13 @@ app.register_blueprint(course_routes, url_prefix="/api/course")
 app.register_blueprint(user_routes, url_prefix="/api/user")
 app.register_blueprint(chatbot_routes, url_prefix="/api/chatbot")
 app.register_blueprint(cover_letter_routes, url_prefix="/api/cover-letter")
+app.register_blueprint(metrics_routes, url_prefix="/api/metrics")
+
+# NLTK data loads lazily on first use; pre-fork servers can load it once in the master instead
+if os.environ.get("PRELOAD_NLTK", "").lower() in ("1", "true", "yes"):
+    preload_nltk_resources()
+
+logger.info(f"App initialized in {time.perf_counter() - _start_time:.2f} seconds")
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
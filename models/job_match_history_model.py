@@ -0,0 +1,23 @@
+from datetime import datetime
+from models.resume_model import get_db
+
+class JobMatchHistory:
+    """All job results of one match request for one resume, stored as a single document."""
+
+    def __init__(self, user_id, resume_hash, resume_text, query, location, jobs):
+        self.user_id = user_id
+        self.resume_hash = resume_hash
+        self.resume_text = resume_text
+        self.query = query
+        self.location = location
+        self.jobs = jobs
+        self.created_at = datetime.now()
+
+    def save(self):
+        db = get_db()
+        db.job_matches.insert_one(self.__dict__)
+
+    @staticmethod
+    def find_all_by_user_id(user_id):
+        db = get_db()
+        return list(db.job_matches.find({"user_id": user_id}))
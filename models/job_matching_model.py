@@ -6,6 +6,8 @@ class JobMatchingResponse(BaseModel):
     company: str
     location: str
     matching_score: float
+    local_score: float
+    score_source: str  # "llm" or "local"
     matched_skills: List[str]
     missing_skills: List[str]
     recommendation: str
@@ -25,6 +25,12 @@ class Resume:
         # Returns all resumes associated with the user ID
         return list(db.resumes.find({"user_id": user_id}))
 
+    @staticmethod
+    def find_all_texts():
+        db = get_db()
+        # Only the text is needed to rebuild the ATS corpus model
+        return db.resumes.find({}, {"resume_text": 1, "_id": 0})
+
     @staticmethod
     def find_by_id_and_user_id(resume_id, user_id):
         db = get_db()
@@ -1,14 +1,24 @@
-from flask import Blueprint, request, jsonify
-import google.generativeai as genai
-from config.db import init_db
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from services.llm_gateway import generate, generate_stream, LLMUnavailableError
 from utils.jwt_utils import verify_jwt_token
-import os
+from services.answer_cache_service import lookup_answer, cache_answer
+from utils.sse import sse_event, SSE_HEADERS
 
 chatbot_routes = Blueprint("chatbot_routes", __name__)
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel('gemini-2.0-flash')
+def _build_prompt(question):
+    # Create a friendly prompt
+    return f"""
+        Act as a friendly career advisor (like an elder sibling). The user is asking: {question}
+        
+        Respond with:
+        1. Helpful career advice in simple language
+        2. If resume-related, include ATS score tips
+        3. Relevant free YouTube playlist links
+        4. Motivational support
+        
+        Format your response with clear sections using markdown.
+        """
 
 @chatbot_routes.route("/ask", methods=["POST"])
 def ask_question():
@@ -29,24 +39,60 @@ def ask_question():
         return jsonify({"error": "Question is required"}), 400
     
     try:
-        # Create a friendly prompt
-        prompt = f"""
-        Act as a friendly career advisor (like an elder sibling). The user is asking: {question}
-        
-        Respond with:
-        1. Helpful career advice in simple language
-        2. If resume-related, include ATS score tips
-        3. Relevant free YouTube playlist links
-        4. Motivational support
-        
-        Format your response with clear sections using markdown.
-        """
+        # Near-identical questions are answered from the local answer cache
+        cached_answer = lookup_answer(question)
+        if cached_answer is not None:
+            return jsonify({"answer": cached_answer, "cached": True}), 200
+
+        prompt = _build_prompt(question)
         
-        response = model.generate_content(prompt)
+        response = generate("chatbot", prompt, model_name='gemini-2.0-flash')
+        cache_answer(question, response.text)
         return jsonify({"answer": response.text}), 200
+    except LLMUnavailableError as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@chatbot_routes.route("/ask/stream", methods=["POST"])
+def ask_question_stream():
+    # Same request as /ask; the answer comes back as server-sent "chunk" events
+    # as it is generated, then a "done" event with the whole answer
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return jsonify({"error": "Unauthorized"}), 401
+    
+    token = auth_header.split(" ")[1]
+    verification = verify_jwt_token(token)
+    
+    if isinstance(verification, dict) and "error" in verification:
+        return jsonify({"error": verification["error"]}), 401
+    
+    data = request.get_json()
+    question = data.get("question")
+    
+    if not question:
+        return jsonify({"error": "Question is required"}), 400
+
+    def stream():
+        parts = []
+        try:
+            cached_answer = lookup_answer(question)
+            if cached_answer is not None:
+                yield sse_event("chunk", {"text": cached_answer})
+                yield sse_event("done", {"answer": cached_answer, "cached": True})
+                return
+
+            for text in generate_stream("chatbot", _build_prompt(question), model_name='gemini-2.0-flash'):
+                parts.append(text)
+                yield sse_event("chunk", {"text": text})
+            cache_answer(question, "".join(parts))
+            yield sse_event("done", {"answer": "".join(parts)})
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream", headers=SSE_HEADERS)
+
 @chatbot_routes.route("/resources", methods=["GET"])
 def get_resources():
     # Predefined career resources
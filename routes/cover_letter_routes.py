@@ -1,6 +1,7 @@
-from flask import Blueprint, request, jsonify
-from services.cover_letter_service import generate_cover_letter
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from services.cover_letter_service import generate_cover_letter, stream_cover_letter
 from utils.jwt_utils import verify_jwt_token
+from utils.sse import sse_event, SSE_HEADERS
 
 cover_letter_routes = Blueprint("cover_letter_routes", __name__)
 
@@ -28,4 +29,34 @@ def generate():
         cover_letter = generate_cover_letter(resume_text, job_description)
         return jsonify({"cover_letter": cover_letter}), 200
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@cover_letter_routes.route("/generate/stream", methods=["POST"])
+def generate_stream():
+    # Same request as /generate; the letter comes back as server-sent events:
+    # "chunk" events with cleaned text as it is generated, then a "done" event
+    # with the final cleaned letter
+    token = request.headers.get("Authorization")
+    if not token:
+        return jsonify({"error": "Authorization token missing"}), 401
+
+    payload = verify_jwt_token(token)
+    if isinstance(payload, str):
+        return jsonify({"error": payload}), 401
+
+    resume_text = request.json.get("resume_text")
+    job_description = request.json.get("job_description")
+
+    if not resume_text or not job_description:
+        return jsonify({"error": "Missing required fields"}), 400
+
+    try:
+        events = stream_cover_letter(resume_text, job_description)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def stream():
+        for event, data in events:
+            yield sse_event(event, data)
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream", headers=SSE_HEADERS)
@@ -1,9 +1,12 @@
 from flask import Blueprint, request, jsonify
-from io import BytesIO
-from services.job_matching_service import fetch_jobs
-from services.resume_service import analyze_resume
+from services.job_matching_service import fetch_jobs, match_resume_to_jobs
+from services.resume_cache_service import load_resume_artifacts
+from models.job_match_history_model import JobMatchHistory
+from utils.jwt_utils import verify_jwt_token
+import logging
 
 job_routes = Blueprint('job_routes', __name__)
+logger = logging.getLogger(__name__)
 
 @job_routes.route('/match', methods=['POST'])
 def match_jobs():
@@ -12,6 +15,11 @@ def match_jobs():
         auth_header = request.headers.get('Authorization')
         if not auth_header or not auth_header.startswith('Bearer '):
             return jsonify({'error': 'Missing authorization token'}), 401
+        payload = verify_jwt_token(auth_header)
+        if not isinstance(payload, dict) or 'error' in payload:
+            error = payload.get('error') if isinstance(payload, dict) else payload
+            return jsonify({'error': error or 'Invalid token'}), 401
+        user_id = payload.get('user_id')
             
         # Validate file upload
         if 'resume' not in request.files:
@@ -21,27 +29,27 @@ def match_jobs():
         query = request.form.get('query', 'Software Engineer')
         location = request.form.get('location', 'India')
 
-        # Process the file
-        file_content = BytesIO(resume_file.read())
-        file_content.filename = resume_file.filename
+        # Parse the resume once; every job is scored against the same analysis
+        artifacts = load_resume_artifacts(resume_file)
+        if not artifacts:
+            return jsonify({'error': 'Failed to parse resume file'}), 400
 
-        # Fetch and analyze jobs
+        # Rank all jobs locally, then analyze only the best ones with Gemini
         jobs = fetch_jobs(query, location)
-        matched_jobs = []
+        matched_jobs = match_resume_to_jobs(artifacts.document, jobs)
 
-        for job in jobs:
-            match_result = analyze_resume(None, file_content, job.get('description', ''))
-            
-            matched_jobs.append({
-                "title": job.get("title", ""),
-                "company": job.get("company_name", ""),
-                "location": job.get("location", ""),
-                "matching_score": match_result.get("matching_score", 0),
-                "matched_skills": match_result.get("matched_skills", []),
-                "missing_skills": match_result.get("missing_skills", []),
-                "recommendation": match_result.get("recommendation", ""),
-                "url": job.get("related_links", [{}])[0].get("link", "") if job.get("related_links") else ""
-            })
+        # One record per request, holding every job's result
+        try:
+            JobMatchHistory(
+                user_id=user_id,
+                resume_hash=artifacts.file_hash,
+                resume_text=artifacts.resume_text,
+                query=query,
+                location=location,
+                jobs=matched_jobs
+            ).save()
+        except Exception as e:
+            logger.error(f"Failed to save job match results: {str(e)}")
 
         return jsonify({"success": True, "jobs": matched_jobs}), 200
         
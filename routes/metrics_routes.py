@@ -0,0 +1,33 @@
+from flask import Blueprint, request, jsonify
+from services.llm_gateway import get_llm_metrics
+from services.llm_cache import get_llm_cache_stats
+from services.resume_cache_service import get_resume_cache_stats
+from services.prompt_compaction_service import get_prompt_compaction_stats
+from services.answer_cache_service import get_answer_cache_stats
+from utils.lemma_cache import get_lemma_cache_stats
+from utils.file_parser import get_extraction_stats
+from services.analysis_job_service import get_analysis_job_stats
+import os
+
+metrics_routes = Blueprint("metrics_routes", __name__)
+
+# When set, the endpoint requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@metrics_routes.route("", methods=["GET"])
+def get_metrics():
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return jsonify({"error": "Unauthorized"}), 401
+
+    # Per-process counters; each worker reports its own
+    return jsonify({
+        "pid": os.getpid(),
+        "llm": get_llm_metrics(),
+        "llm_cache": get_llm_cache_stats(),
+        "resume_cache": get_resume_cache_stats(),
+        "prompt_compaction": get_prompt_compaction_stats(),
+        "chatbot_answer_cache": get_answer_cache_stats(),
+        "lemma_cache": get_lemma_cache_stats(),
+        "extraction": get_extraction_stats(),
+        "analysis_jobs": get_analysis_job_stats()
+    }), 200
@@ -1,47 +1,67 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from utils.jwt_utils import verify_jwt_token
 from services.resume_service import analyze_resume
+from services.analysis_job_service import JobLimitError, submit_analysis_job, get_analysis_job
+from services.bulk_screening_service import iter_archive, screen_resumes, ndjson_rows
 import logging
 
 resume_routes = Blueprint("resume_routes", __name__)
 logger = logging.getLogger(__name__)
 
-@resume_routes.route("/analyze", methods=["POST"])
-def analyze():
-    try:
-        logger.info("Starting resume analysis request")
+def _authenticate():
+    """(user_id, None) for a valid bearer token, else (None, error response)."""
+    token = request.headers.get("Authorization")
+    if not token:
+        logger.error("Missing authorization token")
+        return None, (jsonify({"error": "Authorization token required"}), 401)
 
-        # Verify JWT token
-        token = request.headers.get("Authorization")
-        if not token:
-            logger.error("Missing authorization token")
-            return jsonify({"error": "Authorization token required"}), 401
+    logger.info(f"Received Authorization header: {token[:20]}...")  # Partial log for debugging
+    payload = verify_jwt_token(token)
 
-        logger.info(f"Received Authorization header: {token[:20]}...")  # Partial log for debugging
-        payload = verify_jwt_token(token)
+    if isinstance(payload, dict) and "error" in payload:
+        logger.error(f"Token verification failed: {payload['error']}")
+        return None, (jsonify({"error": payload["error"]}), 401)
 
-        if isinstance(payload, dict) and "error" in payload:
-            logger.error(f"Token verification failed: {payload['error']}")
-            return jsonify({"error": payload["error"]}), 401
+    user_id = payload.get("user_id")
+    if not user_id:
+        logger.error("Invalid token payload, missing user_id")
+        return None, (jsonify({"error": "Invalid token payload"}), 401)
 
-        user_id = payload.get("user_id")
-        if not user_id:
-            logger.error("Invalid token payload, missing user_id")
-            return jsonify({"error": "Invalid token payload"}), 401
+    logger.info(f"Token verified for user {user_id}")
+    return user_id, None
 
-        logger.info(f"Token verified for user {user_id}")
+def _analysis_inputs():
+    """(file, job_description, None) from the form, else (None, None, error response)."""
+    if 'resume' not in request.files:
+        logger.error("No resume file uploaded")
+        return None, None, (jsonify({"error": "Resume file is required"}), 400)
 
-        # Validate file and job description
-        if 'resume' not in request.files:
-            logger.error("No resume file uploaded")
-            return jsonify({"error": "Resume file is required"}), 400
+    file = request.files['resume']
+    job_description = request.form.get('job_description', '').strip()
+
+    if not job_description:
+        logger.error("Empty job description")
+        return None, None, (jsonify({"error": "Job description is required"}), 400)
+
+    return file, job_description, None
+
+@resume_routes.route("/analyze", methods=["POST"])
+def analyze():
+    # ?async=true queues the analysis and answers at once, like POST /jobs
+    if request.args.get("async", "").lower() in ("1", "true", "yes"):
+        return submit_job()
+
+    try:
+        logger.info("Starting resume analysis request")
 
-        file = request.files['resume']
-        job_description = request.form.get('job_description', '').strip()
+        user_id, error = _authenticate()
+        if error:
+            return error
 
-        if not job_description:
-            logger.error("Empty job description")
-            return jsonify({"error": "Job description is required"}), 400
+        # Validate file and job description
+        file, job_description, error = _analysis_inputs()
+        if error:
+            return error
 
         # Process the resume
         logger.info(f"Processing resume for user {user_id}")
@@ -57,3 +77,69 @@ def analyze():
     except Exception as e:
         logger.error(f"Unexpected error in analyze endpoint: {str(e)}", exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
+
+@resume_routes.route("/jobs", methods=["POST"])
+def submit_job():
+    """Queue an analysis and return its job ID; poll GET /jobs/<job_id> for the result."""
+    try:
+        user_id, error = _authenticate()
+        if error:
+            return error
+
+        file, job_description, error = _analysis_inputs()
+        if error:
+            return error
+
+        job_id = submit_analysis_job(user_id, file, job_description)
+        logger.info(f"Queued analysis job {job_id} for user {user_id}")
+        return jsonify({"job_id": job_id, "status": "queued"}), 202
+
+    except JobLimitError as e:
+        return jsonify({"error": str(e)}), 429
+    except Exception as e:
+        logger.error(f"Unexpected error in submit job endpoint: {str(e)}", exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
+
+@resume_routes.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    try:
+        user_id, error = _authenticate()
+        if error:
+            return error
+
+        job = get_analysis_job(job_id, user_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job), 200
+
+    except Exception as e:
+        logger.error(f"Unexpected error in get job endpoint: {str(e)}", exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
+
+@resume_routes.route("/bulk", methods=["POST"])
+def bulk_screen():
+    """
+    Screen every resume in a zip archive ("archive") against one job description.
+    Rows stream back as NDJSON in completion order, ending with a summary row; set
+    "suggestions" to also get LLM suggestions per resume.
+    """
+    user_id, error = _authenticate()
+    if error:
+        return error
+
+    archive = request.files.get('archive')
+    job_description = request.form.get('job_description', '').strip()
+    if not archive:
+        return jsonify({"error": "A zip archive of resumes is required"}), 400
+    if not job_description:
+        return jsonify({"error": "Job description is required"}), 400
+    suggestions = request.form.get('suggestions', '').lower() in ("1", "true", "yes")
+
+    try:
+        files = iter_archive(archive.read())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    logger.info(f"Bulk screening for user {user_id} (suggestions: {suggestions})")
+    rows = screen_resumes(files, job_description, suggestions=suggestions)
+    return Response(stream_with_context(ndjson_rows(rows)), mimetype="application/x-ndjson")
@@ -0,0 +1,385 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta
+from config.db import get_db
+from services.resume_service import UnparseableResumeError, run_resume_analysis
+from services.resume_cache_service import UploadedBytes
+from utils.file_parser import ExtractionTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Where queued analyses live: "mongo" (shared by all workers) or "memory" (this process
+# only, so a single-process server or development)
+ANALYSIS_JOB_BACKEND = os.getenv("ANALYSIS_JOB_BACKEND", "mongo").lower()
+# Threads per process that run queued analyses
+ANALYSIS_JOB_WORKERS = int(os.getenv("ANALYSIS_JOB_WORKERS", 4))
+# Seconds a claimed job stays invisible to other workers; an unfinished job reappears after it
+ANALYSIS_JOB_VISIBILITY_TIMEOUT = float(os.getenv("ANALYSIS_JOB_VISIBILITY_TIMEOUT", 120))
+# Seconds a running job keeps renewing its lease; past this a hung analysis is reclaimed
+ANALYSIS_JOB_MAX_RUNTIME = float(os.getenv("ANALYSIS_JOB_MAX_RUNTIME", 600))
+# Attempts per job, and seconds before the first retry (doubling after each failure)
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", 3))
+# Attempts for a job whose extraction timed out or crashed its worker, which a crafted file can do every time
+ANALYSIS_JOB_EXTRACTION_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_EXTRACTION_ATTEMPTS", 2))
+ANALYSIS_JOB_RETRY_DELAY = float(os.getenv("ANALYSIS_JOB_RETRY_DELAY", 5))
+# Queued or running jobs one user may have at a time
+ANALYSIS_JOBS_PER_USER = int(os.getenv("ANALYSIS_JOBS_PER_USER", 3))
+# Seconds a finished job's result stays available for polling
+ANALYSIS_JOB_TTL = float(os.getenv("ANALYSIS_JOB_TTL", 60 * 60))
+# Seconds an idle worker waits before checking the store again
+ANALYSIS_JOB_POLL_INTERVAL = float(os.getenv("ANALYSIS_JOB_POLL_INTERVAL", 1))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobLimitError(RuntimeError):
+    """The user already has as many jobs in flight as they may."""
+
+
+class MemoryJobStore:
+    """Jobs in a dict of this process; lost on restart."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def insert(self, job, limit):
+        """Add a job unless its user already has limit jobs in flight; returns whether it was added."""
+        with self._lock:
+            self._purge(job["created_at"])
+            active = sum(1 for other in self._jobs.values()
+                         if other["user_id"] == job["user_id"] and other["status"] in (QUEUED, RUNNING))
+            if active >= limit:
+                return False
+            self._jobs[job["_id"]] = job
+            return True
+
+    def _purge(self, now):
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["status"] in (SUCCEEDED, FAILED) and now - job["finished_at"] >= ANALYSIS_JOB_TTL]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def claim(self, now, visibility_timeout):
+        """The oldest due job, marked running under a new lease token, or None."""
+        with self._lock:
+            due = [job for job in self._jobs.values()
+                   if (job["status"] == QUEUED and job["available_at"] <= now)
+                   or (job["status"] == RUNNING and job["lease_until"] <= now)]
+            if not due:
+                return None
+            job = min(due, key=lambda job: job["available_at"])
+            job.update(status=RUNNING, lease_until=now + visibility_timeout, token=uuid.uuid4().hex)
+            job["attempts"] += 1
+            return dict(job)
+
+    def update(self, job_id, token, fields):
+        """Apply fields to a job if the caller still holds its lease; returns whether it did."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["token"] != token:
+                return False
+            job.update(fields)
+            if job["status"] in (SUCCEEDED, FAILED):
+                job.pop("file", None)  # The upload is not needed once the job is done
+            return True
+
+    def extend(self, job_id, token, lease_until):
+        """Push back a running job's lease if the caller still holds it; returns whether it did."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["token"] != token or job["status"] != RUNNING:
+                return False
+            job["lease_until"] = lease_until
+            return True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def counts(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return counts
+
+
+class MongoJobStore:
+    """Jobs in the analysis_jobs collection, shared by every process on the database."""
+
+    def __init__(self):
+        self._indexed = False
+
+    def _collection(self):
+        collection = get_db().analysis_jobs
+        if not self._indexed:
+            collection.create_index([("status", 1), ("available_at", 1)])
+            collection.create_index([("user_id", 1), ("status", 1)])
+            # Mongo deletes finished jobs once expires_at passes
+            collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        return collection
+
+    def insert(self, job, limit):
+        collection = self._collection()
+        # Best effort: two simultaneous submissions may both pass the check
+        if collection.count_documents({"user_id": job["user_id"], "status": {"$in": [QUEUED, RUNNING]}}) >= limit:
+            return False
+        collection.insert_one(job)
+        return True
+
+    def claim(self, now, visibility_timeout):
+        from pymongo import ReturnDocument
+
+        return self._collection().find_one_and_update(
+            {"$or": [
+                {"status": QUEUED, "available_at": {"$lte": now}},
+                {"status": RUNNING, "lease_until": {"$lte": now}}
+            ]},
+            {"$set": {"status": RUNNING, "lease_until": now + visibility_timeout, "token": uuid.uuid4().hex},
+             "$inc": {"attempts": 1}},
+            sort=[("available_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def update(self, job_id, token, fields):
+        update = {"$set": fields}
+        if fields.get("status") in (SUCCEEDED, FAILED):
+            update["$set"] = dict(fields, expires_at=datetime.utcnow() + timedelta(seconds=ANALYSIS_JOB_TTL))
+            update["$unset"] = {"file": ""}  # The upload is not needed once the job is done
+        return self._collection().update_one({"_id": job_id, "token": token}, update).modified_count == 1
+
+    def extend(self, job_id, token, lease_until):
+        return self._collection().update_one(
+            {"_id": job_id, "token": token, "status": RUNNING},
+            {"$set": {"lease_until": lease_until}}
+        ).matched_count == 1
+
+    def get(self, job_id):
+        return self._collection().find_one({"_id": job_id}, {"file": 0})
+
+    def counts(self):
+        return {
+            row["_id"]: row["count"]
+            for row in self._collection().aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+        }
+
+
+class AnalysisJobQueue:
+    """
+    Work queue for resume analyses submitted without waiting for the result. Worker
+    threads claim jobs under a visibility timeout: a job whose worker dies or hangs
+    becomes claimable again once its lease runs out, and a result from a worker that
+    lost its lease is discarded. A running job renews its lease until it has run for
+    ANALYSIS_JOB_MAX_RUNTIME, so a slow analysis is not started twice. Failures other
+    than an unparseable file are retried with exponential backoff up to max_attempts,
+    or ANALYSIS_JOB_EXTRACTION_ATTEMPTS when extraction timed out or crashed.
+    """
+
+    def __init__(self, store, workers=ANALYSIS_JOB_WORKERS, max_attempts=ANALYSIS_JOB_MAX_ATTEMPTS,
+                 visibility_timeout=ANALYSIS_JOB_VISIBILITY_TIMEOUT, per_user=ANALYSIS_JOBS_PER_USER):
+        self.store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.per_user = per_user
+        self._wakeup = threading.Condition()
+        self._started = False
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.lease_lost = 0
+
+    def start(self):
+        """Start the worker threads of this process, once."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for index in range(self.workers):
+            threading.Thread(target=self._work, name=f"analysis-job-{index}", daemon=True).start()
+
+    def submit(self, user_id, file_bytes, filename, job_description):
+        """Queue an analysis and return its job ID; raises JobLimitError if the user is at the cap."""
+        self.start()
+        now = time.time()
+        job = {
+            "_id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "filename": filename,
+            "file": file_bytes,
+            "job_description": job_description,
+            "status": QUEUED,
+            "attempts": 0,
+            "available_at": now,
+            "lease_until": None,
+            "token": None,
+            "created_at": now,
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+        if not self.store.insert(job, self.per_user):
+            with self._lock:
+                self.rejected += 1
+            raise JobLimitError(f"At most {self.per_user} analyses may be in progress at once")
+        with self._lock:
+            self.submitted += 1
+        with self._wakeup:
+            self._wakeup.notify()
+        return job["_id"]
+
+    def get(self, job_id, user_id):
+        """The status (and result or error, once finished) of a user's job, or None."""
+        self.start()
+        job = self.store.get(job_id)
+        if job is None or job["user_id"] != user_id:
+            return None
+        status = {
+            "job_id": job["_id"],
+            "status": job["status"],
+            "attempts": job["attempts"],
+            "created_at": job["created_at"],
+            "finished_at": job["finished_at"]
+        }
+        if job["status"] == SUCCEEDED:
+            status["result"] = job["result"]
+        elif job["status"] == FAILED or job["error"]:
+            status["error"] = job["error"]  # For a queued job, the error of the last attempt
+        return status
+
+    def _work(self):
+        while True:
+            try:
+                job = self.store.claim(time.time(), self.visibility_timeout)
+            except Exception as e:
+                logger.error(f"Failed to claim an analysis job: {str(e)}")
+                job = None
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(ANALYSIS_JOB_POLL_INTERVAL)
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        if job["attempts"] > self.max_attempts:
+            # Its last attempt's worker died or hung past the visibility timeout
+            self._finish(job, FAILED, error="Analysis timed out")
+            return
+        renewing = self._renew_lease(job)
+        try:
+            upload = UploadedBytes(job["file"], job["filename"])
+            result = run_resume_analysis(job["user_id"], upload, job["job_description"])
+        except UnparseableResumeError as e:
+            self._finish(job, FAILED, error=str(e))
+        except Exception as e:
+            # Includes a busy or failed extraction pool, which is what the queue is there to ride out
+            logger.error(f"Analysis job {job['_id']} attempt {job['attempts']} failed: {str(e)}", exc_info=True)
+            if isinstance(e, ExtractionTimeoutError) and job["attempts"] >= min(self.max_attempts,
+                                                                                ANALYSIS_JOB_EXTRACTION_ATTEMPTS):
+                self._finish(job, FAILED, error="Resume could not be extracted in time")
+                return
+            if job["attempts"] >= self.max_attempts:
+                self._finish(job, FAILED, error="Failed to process resume")
+                return
+            delay = ANALYSIS_JOB_RETRY_DELAY * 2 ** (job["attempts"] - 1)
+            if self._update(job, {"status": QUEUED, "available_at": time.time() + delay, "error": str(e)}):
+                with self._lock:
+                    self.retried += 1
+        else:
+            self._finish(job, SUCCEEDED, result=result)
+        finally:
+            renewing.set()
+
+    def _renew_lease(self, job):
+        """Renew a claimed job's lease in the background until the returned event is set."""
+        done = threading.Event()
+        give_up_at = time.monotonic() + ANALYSIS_JOB_MAX_RUNTIME
+
+        def renew():
+            while not done.wait(self.visibility_timeout / 3) and time.monotonic() < give_up_at:
+                try:
+                    if not self.store.extend(job["_id"], job["token"], time.time() + self.visibility_timeout):
+                        return
+                except Exception as e:
+                    logger.error(f"Failed to renew the lease of analysis job {job['_id']}: {str(e)}")
+
+        threading.Thread(target=renew, name=f"analysis-lease-{job['_id'][:8]}", daemon=True).start()
+        return done
+
+    def _finish(self, job, status, result=None, error=None):
+        fields = {"status": status, "result": result, "error": error, "finished_at": time.time()}
+        if self._update(job, fields):
+            with self._lock:
+                if status == SUCCEEDED:
+                    self.succeeded += 1
+                else:
+                    self.failed += 1
+
+    def _update(self, job, fields):
+        try:
+            if self.store.update(job["_id"], job["token"], fields):
+                return True
+        except Exception as e:
+            logger.error(f"Failed to update analysis job {job['_id']}: {str(e)}")
+            return False
+        logger.warning(f"Analysis job {job['_id']} was reclaimed by another worker; dropping this attempt")
+        with self._lock:
+            self.lease_lost += 1
+        return False
+
+    def stats(self):
+        try:
+            jobs = self.store.counts()
+        except Exception as e:
+            logger.error(f"Failed to count analysis jobs: {str(e)}")
+            jobs = None
+        with self._lock:
+            return {
+                "backend": ANALYSIS_JOB_BACKEND,
+                "workers": self.workers if self._started else 0,
+                "jobs": jobs,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "retried": self.retried,
+                "lease_lost": self.lease_lost
+            }
+
+
+def _create_store(backend=ANALYSIS_JOB_BACKEND):
+    if backend == "memory":
+        logger.warning("Analysis jobs are kept in memory: with more than one server process, "
+                       "jobs are only visible to, and capped per user in, the process that took them")
+        return MemoryJobStore()
+    if backend == "mongo":
+        return MongoJobStore()
+    raise ValueError(f"Unknown analysis job backend '{backend}'")
+
+
+analysis_jobs = AnalysisJobQueue(_create_store())
+
+
+def submit_analysis_job(user_id, file, job_description):
+    """Queue an analysis of an uploaded resume; returns the job ID."""
+    return analysis_jobs.submit(user_id, file.read(), file.filename, job_description)
+
+
+def get_analysis_job(job_id, user_id):
+    return analysis_jobs.get(job_id, user_id)
+
+
+def get_analysis_job_stats():
+    return analysis_jobs.stats()
@@ -0,0 +1,278 @@
+import os
+import json
+import atexit
+import math
+import time
+import zlib
+import logging
+import threading
+from difflib import SequenceMatcher
+import numpy as np
+from utils.lemma_cache import lemmatize
+from utils.nltk_resources import get_stop_words
+from utils.text_pipeline import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Where answered questions are persisted, and how often (seconds) a changed index is saved
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", os.path.join("data", "chatbot_answers.json"))
+ANSWER_CACHE_SAVE_INTERVAL = float(os.getenv("ANSWER_CACHE_SAVE_INTERVAL", 300))
+# Most questions held, and the cosine similarity a new question needs to reuse an answer
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", 2000))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.88))
+# Seconds an answer may be served for before it is asked again
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", 7 * 24 * 60 * 60))
+# Width of the hashed feature vectors
+ANSWER_CACHE_DIM = int(os.getenv("ANSWER_CACHE_DIM", 2048))
+
+# Feature weights: whole words, word pairs, and character trigrams (for typos)
+_WORD_WEIGHT = 1.0
+_BIGRAM_WEIGHT = 0.7
+_TRIGRAM_WEIGHT = 0.3
+# Spelling similarity at which two differing words still count as the same word (a typo)
+_TYPO_RATIO = 0.8
+# Stopwords that flip a question's meaning ("should I not...") and so stay in its key
+_NEGATIONS = frozenset([
+    "no", "not", "nor", "never", "without", "against", "cannot",
+    "dont", "doesnt", "didnt", "isnt", "arent", "cant", "wont", "shouldnt"
+])
+
+
+def question_words(question):
+    """
+    Normalized words of a question. Negations, which normalize() drops as stopwords,
+    are kept and fused with the word they negate ("not include" -> "not_include"), so
+    a negated question shares none of that word's features with the plain one.
+    """
+    stop_words = get_stop_words()
+    words = []
+    negation = None
+    for token in tokenize(question):
+        if token in _NEGATIONS:
+            negation = token
+        elif token not in stop_words:
+            word = lemmatize(token)
+            words.append(f"{negation}_{word}" if negation else word)
+            negation = None
+    if negation:
+        words.append(negation)
+    return words
+
+
+def terms_agree(words, other_words):
+    """
+    Whether every word of each question has a counterpart in the other, the same word
+    or a near spelling, so questions that differ in one key term ("Java" vs "Python",
+    "6 months" vs "2 years") never share an answer however close their vectors are.
+    """
+    words, other_words = set(words), set(other_words)
+    for unmatched, candidates in ((words - other_words, other_words), (other_words - words, words)):
+        for word in unmatched:
+            if not any(SequenceMatcher(None, word, candidate).ratio() >= _TYPO_RATIO for candidate in candidates):
+                return False
+    return True
+
+
+def question_vector(question, dim=ANSWER_CACHE_DIM, words=None):
+    """
+    L2-normalized signed feature-hashing vector of a question's words, word pairs and
+    character trigrams, so rephrasings of the same question land close.
+    """
+    if words is None:
+        words = question_words(question)
+    features = {}
+    for word in words:
+        features[word] = features.get(word, 0) + _WORD_WEIGHT
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            trigram = "#" + padded[i:i + 3]
+            features[trigram] = features.get(trigram, 0) + _TRIGRAM_WEIGHT
+    for first, second in zip(words, words[1:]):
+        bigram = f"{first} {second}"
+        features[bigram] = features.get(bigram, 0) + _BIGRAM_WEIGHT
+
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in features.items():
+        h = zlib.crc32(feature.encode("utf-8"))
+        sign = 1.0 if h & 0x80000000 else -1.0
+        # Sublinear weight for repeated features
+        vector[h % dim] += sign * (1 + math.log(weight) if weight >= 1 else weight)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class AnswerCache:
+    """
+    Nearest-neighbour cache of chatbot answers. Question vectors sit in one preallocated
+    NumPy matrix, so a lookup is a single matrix-vector product. Full, it evicts expired
+    answers first, then the least popular (fewest hits, least recently used). A cached
+    question matches when its vector is close enough and its words agree (terms_agree).
+    """
+
+    def __init__(self, path=ANSWER_CACHE_PATH, size=ANSWER_CACHE_SIZE, threshold=ANSWER_CACHE_THRESHOLD,
+                 ttl=ANSWER_CACHE_TTL, dim=ANSWER_CACHE_DIM):
+        self.path = path
+        self.size = size
+        self.threshold = threshold
+        self.ttl = ttl
+        self.dim = dim
+        self._vectors = np.zeros((size, dim), dtype=np.float32)
+        self._created = np.zeros(size)
+        self._last_hit = np.zeros(size)
+        self._hits = np.zeros(size, dtype=np.int64)
+        self._questions = [None] * size
+        self._words = [None] * size
+        self._answers = [None] * size
+        self._count = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._last_save = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _load(self):
+        self._loaded = True
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load chatbot answer cache from {self.path}: {str(e)}")
+            return
+        now = time.time()
+        for entry in entries[-self.size:]:
+            if now - entry["created_at"] < self.ttl:
+                words = question_words(entry["question"])
+                self._place(self._count, question_vector(entry["question"], self.dim, words), words,
+                            entry["question"], entry["answer"], entry["created_at"], entry["last_hit"], entry["hits"])
+                self._count += 1
+
+    def _place(self, slot, vector, words, question, answer, created, last_hit, hits):
+        self._vectors[slot] = vector
+        self._words[slot] = words
+        self._questions[slot] = question
+        self._answers[slot] = answer
+        self._created[slot] = created
+        self._last_hit[slot] = last_hit
+        self._hits[slot] = hits
+
+    def _nearest(self, vector, now):
+        """(slot, similarity) of the closest unexpired question, or (None, 0.0)."""
+        if not self._count:
+            return None, 0.0
+        similarities = self._vectors[:self._count] @ vector
+        similarities[now - self._created[:self._count] >= self.ttl] = -1.0
+        slot = int(np.argmax(similarities))
+        return slot, float(similarities[slot])
+
+    def _matches(self, slot, similarity, words):
+        return slot is not None and similarity >= self.threshold and terms_agree(words, self._words[slot])
+
+    def lookup(self, question):
+        """A cached answer to a question close enough to this one, or None."""
+        words = question_words(question)
+        vector = question_vector(question, self.dim, words)
+        now = time.time()
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            slot, similarity = self._nearest(vector, now)
+            if not self._matches(slot, similarity, words):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._hits[slot] += 1
+            self._last_hit[slot] = now
+            self._dirty = True
+            return self._answers[slot]
+
+    def add(self, question, answer):
+        if not answer:
+            return
+        words = question_words(question)
+        vector = question_vector(question, self.dim, words)
+        now = time.time()
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            slot, similarity = self._nearest(vector, now)
+            hits = 0
+            if self._matches(slot, similarity, words):
+                hits = int(self._hits[slot])  # Refreshing an answer keeps its popularity
+            elif self._count < self.size:
+                slot = self._count
+                self._count += 1
+            else:
+                slot = self._victim(now)
+                self.evictions += 1
+            self._place(slot, vector, words, question, answer, now, now, hits)
+            self._dirty = True
+            if now - self._last_save >= ANSWER_CACHE_SAVE_INTERVAL:
+                self._save(now)
+
+    def _victim(self, now):
+        expired = np.flatnonzero(now - self._created >= self.ttl)
+        if len(expired):
+            return int(expired[0])
+        # Fewest hits first, least recently used among equals
+        return int(np.lexsort((self._last_hit, self._hits))[0])
+
+    def _save(self, now):
+        entries = [
+            {
+                "question": self._questions[slot],
+                "answer": self._answers[slot],
+                "created_at": float(self._created[slot]),
+                "last_hit": float(self._last_hit[slot]),
+                "hits": int(self._hits[slot])
+            }
+            for slot in np.argsort(self._created[:self._count])
+        ]
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+            self._last_save = now
+        except OSError as e:
+            logger.error(f"Failed to save chatbot answer cache to {self.path}: {str(e)}")
+
+    def save(self):
+        """Persist the index now if it changed since the last save."""
+        with self._lock:
+            if self._dirty:
+                self._save(time.time())
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": self._count,
+                "size": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+answer_cache = AnswerCache()
+# Keep what was learned since the last periodic save across restarts
+atexit.register(answer_cache.save)
+
+
+def lookup_answer(question):
+    return answer_cache.lookup(question)
+
+
+def cache_answer(question, answer):
+    answer_cache.add(question, answer)
+
+
+def get_answer_cache_stats():
+    return answer_cache.stats()
@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+import joblib
+from sklearn.feature_extraction.text import TfidfVectorizer
+from utils.keyword_extractor import preprocess_text
+
+logger = logging.getLogger(__name__)
+
+# Location of the serialized corpus model and how often workers look for a newer one
+ATS_MODEL_PATH = os.getenv("ATS_MODEL_PATH", os.path.join("data", "ats_model.joblib"))
+ATS_MODEL_MAX_FEATURES = int(os.getenv("ATS_MODEL_MAX_FEATURES", 20000))
+ATS_MODEL_RELOAD_INTERVAL = float(os.getenv("ATS_MODEL_RELOAD_INTERVAL", 60))
+
+_model = None
+_model_mtime = None
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def build_ats_model(resume_texts, job_descriptions=(), path=ATS_MODEL_PATH):
+    """
+    Fit a vocabulary and IDF table over a corpus of resumes and job descriptions
+    and write it to disk. Returns the version string of the new model.
+    """
+    corpus = [preprocess_text(text) for text in list(resume_texts) + list(job_descriptions) if text]
+    corpus = [doc for doc in corpus if doc]
+    if not corpus:
+        raise ValueError("Cannot build ATS model from an empty corpus")
+
+    vectorizer = TfidfVectorizer(max_features=ATS_MODEL_MAX_FEATURES, stop_words="english")
+    vectorizer.fit(corpus)
+
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    model = {
+        "version": version,
+        "documents": len(corpus),
+        "vectorizer": vectorizer
+    }
+
+    # Write next to the target and swap in place so running workers never read a partial file
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, path)
+
+    logger.info(f"Built ATS model {version} from {len(corpus)} documents, {len(vectorizer.vocabulary_)} terms")
+    return version
+
+
+def load_ats_model(path=ATS_MODEL_PATH):
+    """
+    Load the corpus model from disk. Called once at startup so pre-fork servers
+    share the loaded model with every worker; returns None when no model is built.
+    """
+    global _model, _model_mtime, _last_check
+    with _lock:
+        _last_check = time.monotonic()
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return _model
+
+        if _model is not None and mtime == _model_mtime:
+            return _model
+
+        try:
+            model = joblib.load(path)
+        except Exception as e:
+            logger.error(f"Failed to load ATS model from {path}: {str(e)}")
+            return _model
+
+        previous = _model["version"] if _model else None
+        _model, _model_mtime = model, mtime
+        logger.info(f"Loaded ATS model {model['version']} (previous: {previous})")
+        return _model
+
+
+def get_ats_model():
+    """
+    Return the current corpus model, reloading it when a newer file has been
+    built since the last check. Returns None when no model is available.
+    """
+    if time.monotonic() - _last_check >= ATS_MODEL_RELOAD_INTERVAL:
+        return load_ats_model()
+    return _model
+
+
+def get_ats_model_version():
+    model = _model
+    return model["version"] if model else None
+
+
+def _load_stored_resume_texts():
+    from models.resume_model import Resume
+    return (doc.get("resume_text", "") for doc in Resume.find_all_texts())
+
+
+def _load_job_descriptions(directory):
+    texts = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".txt"):
+            with open(os.path.join(directory, name), encoding="utf-8", errors="ignore") as f:
+                texts.append(f.read())
+    return texts
+
+
+# Periodic rebuild, e.g. from cron:
+#   python -m services.ats_model_service [directory of job description .txt files]
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    job_descriptions = _load_job_descriptions(sys.argv[1]) if len(sys.argv) > 1 else []
+    version = build_ats_model(_load_stored_resume_texts(), job_descriptions)
+    print(f"ATS model version {version} written to {ATS_MODEL_PATH}")
@@ -1,51 +1,263 @@
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from utils.keyword_extractor import preprocess_text
+from utils.keyword_extractor import preprocess_text, AnalyzedDocument
+from services.ats_model_service import get_ats_model
+from utils.skill_matcher import find_section_mentions
+from utils.text_pipeline import TextPipeline, normalize
+import numpy as np
 import math
 
+# Vectorizer settings shared by the per-pair and batch scorers
+MAX_FEATURES = 500
+SECTIONS = ['experience', 'education', 'skills', 'projects']
+
+# Smoothed IDF of a term that occurs in only one document of a two-document corpus
+_SINGLE_DOC_IDF = math.log(3 / 2) + 1
+
+
+def _processed(document):
+    """Preprocessed text of a raw string or an AnalyzedDocument, "" for invalid input"""
+    if isinstance(document, AnalyzedDocument):
+        return document.processed_text
+    if not document or not isinstance(document, str):
+        return ""
+    return preprocess_text(document)
+
+
+def _length_score(processed_resume):
+    """Resume length score (10% of total)"""
+    word_count = len(processed_resume.split())
+    if word_count > 500:
+        return 10
+    elif word_count > 300:
+        return 7
+    elif word_count > 100:
+        return 5
+    return 0
+
+
+def _section_score(processed_resume):
+    """Section presence score (20% of total), 5 points per section"""
+    # One pass of the section heading matcher; it also recognizes the lemmatized
+    # "skill"/"project" forms that a plain substring check for "skills" misses
+    mentions = find_section_mentions(processed_resume)
+    section_count = sum(1 for section in SECTIONS if mentions[section])
+    return section_count * 5
+
+
+def _total_score(keyword_similarity, processed_resume):
+    keyword_score = min(70, keyword_similarity * 70)  # 70 points max for keywords
+    total_score = keyword_score + _length_score(processed_resume) + _section_score(processed_resume)
+    return min(100, math.ceil(total_score))  # Cap at 100 and round up
+
+
 def calculate_ats_score(resume_text, job_description):
     """
     Calculate ATS score combining both keyword matching and structural analysis
     following the same logic as the JavaScript version but with Python implementation.
+    Either argument may be an AnalyzedDocument to reuse its preprocessing.
     """
-    if not resume_text or not job_description or not isinstance(resume_text, str) or not isinstance(job_description, str):
-        return 0
-    
     try:
         # Preprocess texts
-        processed_resume = preprocess_text(resume_text)
-        processed_jd = preprocess_text(job_description)
-        
+        processed_resume = _processed(resume_text)
+        processed_jd = _processed(job_description)
+
         if not processed_resume or not processed_jd:
             return 0
 
         # 1. Keyword matching score (70% of total)
-        # Using TF-IDF and cosine similarity for keyword matching
-        vectorizer = TfidfVectorizer(max_features=500, stop_words="english")
-        tfidf_matrix = vectorizer.fit_transform([processed_resume, processed_jd])
-        keyword_similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
-        keyword_score = min(70, keyword_similarity * 70)  # 70 points max for keywords
-
-        # 2. Resume length score (10% of total)
-        word_count = len(processed_resume.split())
-        if word_count > 500:
-            length_score = 10
-        elif word_count > 300:
-            length_score = 7
-        elif word_count > 100:
-            length_score = 5
+        # Using TF-IDF and cosine similarity for keyword matching, against the
+        # corpus-level model when one has been built
+        model = get_ats_model()
+        if model:
+            resume_vector = _resume_vector(model, resume_text, processed_resume)
+            keyword_similarity = _model_similarities(model, resume_vector, [processed_jd])[0]
         else:
-            length_score = 0
+            vectorizer = TfidfVectorizer(max_features=MAX_FEATURES, stop_words="english")
+            tfidf_matrix = vectorizer.fit_transform([processed_resume, processed_jd])
+            keyword_similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
 
-        # 3. Section presence score (20% of total)
-        sections = ['experience', 'education', 'skills', 'projects']
-        section_count = sum(1 for section in sections if section in processed_resume.lower())
-        section_score = section_count * 5  # 5 points per section
-
-        # Calculate total score
-        total_score = keyword_score + length_score + section_score
-        return min(100, math.ceil(total_score))  # Cap at 100 and round up
+        # 2. Resume length score and 3. Section presence score
+        return _total_score(keyword_similarity, processed_resume)
 
     except Exception as e:
         print(f'ATS score calculation error: {e}')
         return 0  # Return minimum score on error
+
+
+def _pruned_similarity(resume_counts, jd_counts):
+    """
+    Cosine similarity for a pair whose combined vocabulary exceeds MAX_FEATURES,
+    keeping the same top terms TfidfVectorizer would keep for that pair.
+    Both arguments are dense count arrays over the pair's vocabulary in sorted order.
+    """
+    term_freqs = (resume_counts + jd_counts).astype(np.int64)
+    keep = np.zeros(len(term_freqs), dtype=bool)
+    keep[(-term_freqs).argsort()[:MAX_FEATURES]] = True
+    resume_counts = resume_counts[keep]
+    jd_counts = jd_counts[keep]
+
+    idf = np.where((resume_counts > 0) & (jd_counts > 0), 1.0, _SINGLE_DOC_IDF)
+    resume_vec = resume_counts * idf
+    jd_vec = jd_counts * idf
+    norm = np.linalg.norm(resume_vec) * np.linalg.norm(jd_vec)
+    return float(resume_vec @ jd_vec / norm) if norm else 0.0
+
+
+def _lemmas(document):
+    if isinstance(document, AnalyzedDocument):
+        return document.lemmas
+    return normalize(document) if document and isinstance(document, str) else []
+
+
+def _pairwise_similarities(resume_lemmas, jd_lemmas):
+    """
+    Per-pair TF-IDF cosine similarities of one resume against many job descriptions,
+    computed without fitting a vectorizer per pair. Entries are None where the pair
+    has no vocabulary at all, which makes calculate_ats_score fail and return 0.
+    """
+    # One vocabulary over the resume and every JD, sorted like CountVectorizer's, so any
+    # per-pair subset keeps the same order TfidfVectorizer would give that pair
+    pipeline = TextPipeline()
+    encoded = [pipeline.encode_lemmas(resume_lemmas)] + [pipeline.encode_lemmas(lemmas) for lemmas in jd_lemmas]
+    counts, features = pipeline.ats_count_matrix(encoded)
+    if not features:
+        return [None] * len(jd_lemmas)  # Nothing but stopwords anywhere
+
+    resume_vec = counts[0].toarray().ravel()
+    jd_matrix = counts[1:]
+    jd_present = jd_matrix.copy()
+    jd_present.data[:] = 1.0
+    resume_present = (resume_vec > 0).astype(np.float64)
+
+    # In a two-document corpus a term shared by both gets idf 1, every other term
+    # gets _SINGLE_DOC_IDF, so the per-pair TF-IDF norms and dot product reduce to:
+    c2 = _SINGLE_DOC_IDF ** 2
+    dots = jd_matrix @ resume_vec
+    shared_resume_sq = jd_present @ (resume_vec ** 2)
+    shared_jd_sq = jd_matrix.multiply(jd_matrix) @ resume_present
+    jd_sq = np.asarray(jd_matrix.multiply(jd_matrix).sum(axis=1)).ravel()
+    resume_norm_sq = c2 * (resume_vec @ resume_vec) - (c2 - 1) * shared_resume_sq
+    jd_norm_sq = c2 * jd_sq - (c2 - 1) * shared_jd_sq
+    norms = np.sqrt(resume_norm_sq * jd_norm_sq)
+    similarities = np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+    # Pairs whose combined vocabulary exceeds max_features need the pruned vocabulary
+    resume_terms = np.flatnonzero(resume_vec)
+    jd_lengths = np.diff(jd_matrix.indptr)
+    vocab_sizes = resume_terms.size + jd_lengths - (jd_present @ resume_present)
+    for row in np.flatnonzero(vocab_sizes > MAX_FEATURES):
+        jd_row = jd_matrix[row]
+        terms = np.union1d(resume_terms, jd_row.indices)
+        similarities[row] = _pruned_similarity(
+            resume_vec[terms], jd_row[:, terms].toarray().ravel()
+        )
+
+    return [
+        None if not resume_terms.size and not jd_lengths[row] else similarities[row]
+        for row in range(len(jd_lemmas))
+    ]
+
+
+def _resume_vector(model, resume, processed_resume):
+    """
+    The resume's TF-IDF row under the corpus model. An AnalyzedDocument keeps it per
+    model version, so a cached resume is only vectorized once.
+    """
+    if isinstance(resume, AnalyzedDocument):
+        vector = resume.vectors.get(model["version"])
+        if vector is None:
+            vector = resume.vectors[model["version"]] = model["vectorizer"].transform([processed_resume])
+        return vector
+    return model["vectorizer"].transform([processed_resume])
+
+
+def _model_similarities(model, resume_vector, processed_jds):
+    """
+    Cosine similarities against the corpus-level model: a transform of the JDs and
+    one sparse matrix-vector product, with no fitting at request time.
+    """
+    jd_matrix = model["vectorizer"].transform(processed_jds)
+    # Rows are already L2-normalized, so the dot product is the cosine similarity
+    return (jd_matrix @ resume_vector.T).toarray().ravel().tolist()
+
+
+def calculate_ats_scores(resume_text, job_descriptions):
+    """
+    Calculate ATS scores of one resume against many job descriptions.
+
+    The resume is preprocessed once and all job descriptions are vectorized in a single
+    sparse matrix, so the keyword similarities come from sparse matrix-vector products
+    instead of one TF-IDF fit per pair. Scores match calculate_ats_score for every pair.
+    The resume and job descriptions may be AnalyzedDocuments.
+    """
+    job_descriptions = list(job_descriptions)
+    scores = [0] * len(job_descriptions)
+
+    try:
+        resume_lemmas = _lemmas(resume_text)
+        processed_resume = " ".join(resume_lemmas)
+        if not processed_resume:
+            return scores
+
+        jd_lemmas = {index: _lemmas(jd) for index, jd in enumerate(job_descriptions)}
+        jd_lemmas = {index: lemmas for index, lemmas in jd_lemmas.items() if lemmas}
+        if not jd_lemmas:
+            return scores
+
+        model = get_ats_model()
+        if model:
+            resume_vector = _resume_vector(model, resume_text, processed_resume)
+            processed_jds = [" ".join(lemmas) for lemmas in jd_lemmas.values()]
+            similarities = _model_similarities(model, resume_vector, processed_jds)
+        else:
+            similarities = _pairwise_similarities(resume_lemmas, list(jd_lemmas.values()))
+
+        for index, similarity in zip(jd_lemmas, similarities):
+            if similarity is not None:
+                scores[index] = _total_score(similarity, processed_resume)
+        return scores
+
+    except Exception as e:
+        print(f'Batch ATS score calculation error: {e}')
+        return scores
+
+
+def calculate_ats_scores_for_job(resumes, job_description):
+    """
+    Calculate ATS scores of many resumes against one job description.
+
+    The per-pair TF-IDF similarity is symmetric, so the job description is preprocessed
+    once and takes the resume's place in the batch computation of calculate_ats_scores.
+    Scores match calculate_ats_score for every pair. The resumes and job description
+    may be AnalyzedDocuments.
+    """
+    resumes = list(resumes)
+    scores = [0] * len(resumes)
+
+    try:
+        jd_lemmas = _lemmas(job_description)
+        if not jd_lemmas:
+            return scores
+
+        resume_lemmas = {index: _lemmas(resume) for index, resume in enumerate(resumes)}
+        resume_lemmas = {index: lemmas for index, lemmas in resume_lemmas.items() if lemmas}
+        if not resume_lemmas:
+            return scores
+
+        model = get_ats_model()
+        if model:
+            jd_vector = model["vectorizer"].transform([" ".join(jd_lemmas)])
+            processed_resumes = [" ".join(lemmas) for lemmas in resume_lemmas.values()]
+            similarities = _model_similarities(model, jd_vector, processed_resumes)
+        else:
+            similarities = _pairwise_similarities(jd_lemmas, list(resume_lemmas.values()))
+
+        for index, similarity in zip(resume_lemmas, similarities):
+            if similarity is not None:
+                scores[index] = _total_score(similarity, " ".join(resume_lemmas[index]))
+        return scores
+
+    except Exception as e:
+        print(f'Batch ATS score calculation error: {e}')
+        return scores
@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import time
+import zipfile
+import logging
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from services.ats_score_service import calculate_ats_scores_for_job
+from services.gemini_service import analyze_resume_with_gemini
+from services.resume_cache_service import UploadedBytes, load_resume_artifacts
+from services.skill_taxonomy_service import skill_mask, diff_skill_masks
+from utils.file_parser import EXTRACT_MAX_BYTES, EXTRACT_WORKERS
+from utils.keyword_extractor import AnalyzedDocument, extract_keywords
+
+logger = logging.getLogger(__name__)
+
+# Most resumes screened in one bulk request
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", 500))
+# Threads feeding uploads to the extraction pool; more than its workers would only queue
+BULK_PARSE_WORKERS = int(os.getenv("BULK_PARSE_WORKERS", max(1, EXTRACT_WORKERS)))
+# LLM suggestions, when requested: calls in flight at once and calls started per second
+BULK_LLM_CONCURRENCY = int(os.getenv("BULK_LLM_CONCURRENCY", 2))
+BULK_LLM_RATE = float(os.getenv("BULK_LLM_RATE", 1))
+
+RESUME_EXTENSIONS = (".pdf", ".docx", ".txt")
+
+
+def _is_resume(name):
+    base = os.path.basename(name)
+    return name.lower().endswith(RESUME_EXTENSIONS) and not base.startswith(".") and not name.startswith("__MACOSX/")
+
+
+def iter_archive(archive_bytes):
+    """
+    (name, bytes) of each resume in a zip archive, read one at a time; bytes is None for
+    an entry that cannot be read. Raises ValueError up front for an invalid archive or
+    one with more than BULK_MAX_FILES resumes.
+    """
+    try:
+        archive = zipfile.ZipFile(BytesIO(archive_bytes))
+    except zipfile.BadZipFile:
+        raise ValueError("Archive is not a valid zip file")
+    entries = [info for info in archive.infolist() if not info.is_dir() and _is_resume(info.filename)]
+    if len(entries) > BULK_MAX_FILES:
+        archive.close()
+        raise ValueError(f"Archive holds {len(entries)} resumes; at most {BULK_MAX_FILES} can be screened at once")
+
+    def files():
+        with archive:
+            for info in entries:
+                try:
+                    with archive.open(info) as entry:
+                        # Never trust the declared size; one byte over the limit is enough to refuse it
+                        data = entry.read(EXTRACT_MAX_BYTES + 1)
+                except Exception as e:
+                    # Bad CRC, encrypted entry, unsupported compression...
+                    logger.error(f"Failed to read {info.filename} from the archive: {str(e)}")
+                    data = None
+                yield info.filename, data
+
+    return files()
+
+
+def iter_directory(path):
+    """
+    (name, bytes) of each resume under a directory, in sorted order, read one at a time;
+    bytes is None for a file that cannot be read.
+    """
+    names = []
+    for root, dirs, filenames in os.walk(path):
+        dirs.sort()
+        names.extend(os.path.relpath(os.path.join(root, name), path) for name in sorted(filenames) if _is_resume(name))
+    for name in names:
+        try:
+            with open(os.path.join(path, name), "rb") as f:
+                data = f.read(EXTRACT_MAX_BYTES + 1)
+        except OSError as e:
+            logger.error(f"Failed to read {name}: {str(e)}")
+            data = None
+        yield name, data
+
+
+class _RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate > 0 else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _parse(name, file_bytes):
+    # Dispatch on the lowercased name so "CV.PDF" parses as a PDF
+    return load_resume_artifacts(UploadedBytes(file_bytes, name.lower()))
+
+
+def _suggestions(limiter, resume_doc, jd_doc):
+    limiter.acquire()
+    result = analyze_resume_with_gemini(resume_doc, jd_doc)
+    return result.get("suggestions", []), "fallback" if result.get("fallback") else "ok"
+
+
+def _score_batch(parsed, jd_doc, job_keywords, jd_mask):
+    """Result rows of a batch of (name, artifacts), with the ATS scores computed together."""
+    scores = calculate_ats_scores_for_job([artifacts.document for _, artifacts in parsed], jd_doc)
+    rows = []
+    for (name, artifacts), score in zip(parsed, scores):
+        resume_keywords = set(artifacts.keywords or [])
+        rows.append({
+            "file": name,
+            "resume_hash": artifacts.file_hash,
+            "ats_score": score,
+            "keywords": sorted(resume_keywords & job_keywords),
+            "missing_keywords": sorted(job_keywords - resume_keywords),
+            **diff_skill_masks(skill_mask(artifacts.document), jd_mask)
+        })
+    return rows
+
+
+def screen_resumes(files, job_description, suggestions=False):
+    """
+    Screen many resumes against one job description, yielding one row per resume in
+    the order results complete, then a {"summary": ...} row. files yields (name, bytes),
+    with None for a file that could not be read.
+
+    The job description is analyzed once. Resumes are parsed BULK_PARSE_WORKERS at a
+    time through the extraction pool, and each round of finished parses is scored
+    together. With suggestions, each scored resume also gets LLM suggestions, limited
+    to BULK_LLM_CONCURRENCY calls in flight and BULK_LLM_RATE calls per second; its row
+    is held until they arrive, so local scoring never waits on the LLM.
+    """
+    start_time = time.time()
+    jd_doc = AnalyzedDocument(job_description)
+    job_keywords = set(extract_keywords(jd_doc, mode="ngram") or [])
+    jd_mask = skill_mask(jd_doc)
+
+    files = iter(files)
+    parse_pool = ThreadPoolExecutor(max_workers=BULK_PARSE_WORKERS, thread_name_prefix="bulk-parse")
+    llm_pool = ThreadPoolExecutor(max_workers=BULK_LLM_CONCURRENCY, thread_name_prefix="bulk-llm") if suggestions else None
+    limiter = _RateLimiter(BULK_LLM_RATE)
+    parsing = {}  # Future -> file name
+    asking = {}  # Future -> row waiting for its suggestions
+    unreadable = []  # Error rows of files that could not be read, not yet yielded
+    counts = {"files": 0, "scored": 0, "errors": 0}
+
+    def refill():
+        # Keep the parse pool busy without reading every file into memory at once
+        nonlocal files
+        while len(parsing) < 2 * BULK_PARSE_WORKERS:
+            try:
+                entry = next(files, None)
+            except Exception as e:
+                logger.error(f"Failed to read further files: {str(e)}")
+                unreadable.append({"error": f"Stopped reading files: {str(e)}"})
+                counts["errors"] += 1
+                files = iter(())
+                return
+            if entry is None:
+                return
+            name, file_bytes = entry
+            counts["files"] += 1
+            if file_bytes is None:
+                counts["errors"] += 1
+                unreadable.append({"file": name, "error": "Failed to read file"})
+                continue
+            parsing[parse_pool.submit(_parse, name, file_bytes)] = name
+
+    try:
+        refill()
+        yield from unreadable
+        unreadable.clear()
+        while parsing or asking:
+            done, _ = wait(list(parsing) + list(asking), return_when=FIRST_COMPLETED)
+            parsed = []
+            for future in done:
+                if future in asking:
+                    row = asking.pop(future)
+                    try:
+                        row["suggestions"], row["llm_status"] = future.result()
+                    except Exception as e:
+                        logger.error(f"LLM suggestions failed for {row['file']}: {str(e)}")
+                        row["suggestions"] = []
+                        row["llm_status"] = "error"
+                    yield row
+                    continue
+                name = parsing.pop(future)
+                try:
+                    artifacts = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to parse {name}: {str(e)}")
+                    artifacts = None
+                if artifacts is None:
+                    counts["errors"] += 1
+                    yield {"file": name, "error": "Failed to parse resume file"}
+                else:
+                    parsed.append((name, artifacts))
+            refill()
+            yield from unreadable
+            unreadable.clear()
+
+            if not parsed:
+                continue
+            for (_, artifacts), row in zip(parsed, _score_batch(parsed, jd_doc, job_keywords, jd_mask)):
+                counts["scored"] += 1
+                if suggestions:
+                    asking[llm_pool.submit(_suggestions, limiter, artifacts.document, jd_doc)] = row
+                else:
+                    yield row
+
+        yield {"summary": dict(counts, seconds=round(time.time() - start_time, 2))}
+    finally:
+        # Also reached when the client goes away mid-stream: drop the work not yet started
+        parse_pool.shutdown(wait=False, cancel_futures=True)
+        if llm_pool:
+            llm_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def ndjson_rows(rows):
+    """Serialize rows as newline-delimited JSON."""
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+if __name__ == "__main__":
+    # python -m services.bulk_screening_service <resume directory> <job description file> [--suggestions]
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if len(args) != 2:
+        print("usage: python -m services.bulk_screening_service <resume_dir> <job_description_file> [--suggestions]",
+              file=sys.stderr)
+        sys.exit(2)
+    with open(args[1], encoding="utf-8") as f:
+        jd_text = f.read()
+    for line in ndjson_rows(screen_resumes(iter_directory(args[0]), jd_text, suggestions="--suggestions" in sys.argv)):
+        sys.stdout.write(line)
+        sys.stdout.flush()
@@ -0,0 +1,105 @@
+import os
+import time
+import threading
+from collections import deque
+
+# Recent calls a breaker judges on, and how many it needs before it may open
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", 20))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", 10))
+# Open when this share of recent calls failed or timed out...
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", 0.5))
+# ...or when their p95 latency reaches this many seconds
+LLM_BREAKER_LATENCY_P95 = float(os.getenv("LLM_BREAKER_LATENCY_P95", 20))
+# Seconds an open breaker rejects calls before letting probes through
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", 30))
+# Calls let through at once while half-open
+LLM_BREAKER_PROBES = int(os.getenv("LLM_BREAKER_PROBES", 1))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome and latency of recent calls to one model/endpoint. Closed, it
+    lets calls through; once the error rate or p95 latency crosses its threshold it
+    opens and rejects calls so callers fall back at once. After the cooldown it
+    half-opens and lets a few probe calls through: a successful probe closes it, a
+    failed one opens it again.
+    """
+
+    def __init__(self, window=LLM_BREAKER_WINDOW, min_calls=LLM_BREAKER_MIN_CALLS,
+                 error_rate=LLM_BREAKER_ERROR_RATE, latency_p95=LLM_BREAKER_LATENCY_P95,
+                 cooldown=LLM_BREAKER_COOLDOWN, probes=LLM_BREAKER_PROBES):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.latency_p95 = latency_p95
+        self.cooldown = cooldown
+        self.probes = probes
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)  # (succeeded, seconds)
+        self._opened_at = None
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self):
+        """Whether a call may go through now; a True while half-open reserves a probe."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= self.probes:
+                    self.rejected += 1
+                    return False
+                self._probes_in_flight += 1
+            return True
+
+    def abandon(self):
+        """Give back a probe reserved by allow() for a call that never started."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+
+    def record(self, succeeded, seconds):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if succeeded:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            self._outcomes.append((succeeded, seconds))
+            if self.state == CLOSED and len(self._outcomes) >= self.min_calls:
+                if self._failure_rate() >= self.error_rate or self._p95() >= self.latency_p95:
+                    self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.opened += 1
+
+    def _failure_rate(self):
+        return sum(1 for succeeded, _ in self._outcomes if not succeeded) / len(self._outcomes)
+
+    def _p95(self):
+        latencies = sorted(seconds for _, seconds in self._outcomes)
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "calls_in_window": len(self._outcomes),
+                "error_rate": round(self._failure_rate(), 4) if self._outcomes else 0.0,
+                "latency_p95": round(self._p95(), 3) if self._outcomes else None,
+                "opened": self.opened,
+                "rejected": self.rejected
+            }
@@ -1,20 +1,17 @@
-import google.generativeai as genai
-import os
 from dotenv import load_dotenv
 import re
 import json
+from services.llm_gateway import generate
+from services.prompt_compaction_service import compact_prompt_inputs
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
 def recommend_courses(resume_text):
     try:
-        # Use Gemini Pro model
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
+        resume_text, _ = compact_prompt_inputs("course_recommendation", resume_text)
+
         # Detailed prompt for structured course recommendations
         prompt = f"""
         Analyze the following resume and recommend 3-4 online courses or certifications 
@@ -40,7 +37,7 @@ def recommend_courses(resume_text):
         """
         
         # Generate content
-        response = model.generate_content(prompt)
+        response = generate("course_recommendation", prompt, model_name='gemini-2.0-flash')
         
         # Parse the JSON response
         courses = parse_course_recommendations(response.text)
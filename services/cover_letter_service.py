@@ -1,55 +1,49 @@
-import google.generativeai as genai
-import os
 from dotenv import load_dotenv
 import re
 import logging
+from services.llm_gateway import generate, generate_stream
+from services.prompt_compaction_service import compact_prompt_inputs
 
 logger = logging.getLogger(__name__)
 
-# Configure Gemini API with error handling
-try:
-    load_dotenv()
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    logger.info("Gemini API configured successfully")
-except Exception as e:
-    logger.error(f"Gemini configuration failed: {str(e)}")
-    raise RuntimeError("AI service initialization failed")
+load_dotenv()
 
-def generate_cover_letter(resume_text, job_description):
-    """Generate a professional cover letter with enhanced error handling"""
-    try:
-        # Validate inputs
-        if not isinstance(resume_text, str) or not isinstance(job_description, str):
-            raise ValueError("Inputs must be strings")
-            
-        if len(resume_text) < 50 or len(job_description) < 50:
-            raise ValueError("Inputs must be at least 50 characters")
-
-        # Initialize model with safety settings
-        model = genai.GenerativeModel(
-            'gemini-1.5-pro',
-            generation_config={
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "top_k": 40,
-                "max_output_tokens": 2048
-            },
-            safety_settings=[
-                {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-                {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"}
-            ]
-        )
+MODEL_NAME = 'gemini-1.5-pro'
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "top_k": 40,
+    "max_output_tokens": 2048
+}
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"}
+]
 
-        # Create structured prompt
-        prompt = f"""Generate a professional cover letter based on:
+_CODE_BLOCK = re.compile(r'```.*?```', flags=re.DOTALL)
+_EMPHASIS = re.compile(r'[*_]{2,}')
+_BLANK_LINES = re.compile(r'\n\s*\n')
+_PLACEHOLDER = re.compile(r'\[.*?\]')
+
+def _validate_inputs(resume_text, job_description):
+    if not isinstance(resume_text, str) or not isinstance(job_description, str):
+        raise ValueError("Inputs must be strings")
+
+    if len(resume_text) < 50 or len(job_description) < 50:
+        raise ValueError("Inputs must be at least 50 characters")
+
+def _build_prompt(resume_text, job_description):
+    # Fit both inputs to the endpoint's token budget, the resume ranked against the job
+    resume_text, job_description = compact_prompt_inputs("cover_letter", resume_text, job_description)
+    return f"""Generate a professional cover letter based on:
         
         Resume:
-        {resume_text[:5000]}  # Limit input size
+        {resume_text}
         
         Job Description:
-        {job_description[:2000]}  # Limit input size
+        {job_description}
         
         Requirements:
         - 3-4 well-structured paragraphs
@@ -62,8 +56,23 @@ def generate_cover_letter(resume_text, job_description):
         - Target length: 300-500 words
         """
 
-        # Generate content
-        response = model.generate_content(prompt)
+def generate_cover_letter(resume_text, job_description):
+    """Generate a professional cover letter with enhanced error handling"""
+    try:
+        # Validate inputs
+        _validate_inputs(resume_text, job_description)
+
+        # Create structured prompt
+        prompt = _build_prompt(resume_text, job_description)
+
+        # Generate content with the shared model instance and safety settings
+        response = generate(
+            "cover_letter",
+            prompt,
+            model_name=MODEL_NAME,
+            generation_config=GENERATION_CONFIG,
+            safety_settings=SAFETY_SETTINGS
+        )
         
         if not response.text:
             raise ValueError("Empty response from AI model")
@@ -77,25 +86,96 @@ def generate_cover_letter(resume_text, job_description):
         logger.error(f"Cover letter generation failed: {str(e)}")
         return generate_fallback_cover_letter()
 
+def stream_cover_letter(resume_text, job_description):
+    """
+    Stream a cover letter as (event, data) pairs: "chunk" events with cleaned text as it
+    arrives, then one "done" event with the fully cleaned letter. Invalid inputs raise
+    ValueError before anything is streamed; a failed generation ends with an "error"
+    event and the fallback letter.
+    """
+    _validate_inputs(resume_text, job_description)
+    prompt = _build_prompt(resume_text, job_description)
+
+    def events():
+        cleaner = _StreamCleaner()
+        parts = []
+        try:
+            for text in generate_stream(
+                "cover_letter",
+                prompt,
+                model_name=MODEL_NAME,
+                generation_config=GENERATION_CONFIG,
+                safety_settings=SAFETY_SETTINGS
+            ):
+                parts.append(text)
+                cleaned = cleaner.feed(text)
+                if cleaned:
+                    yield "chunk", {"text": cleaned}
+            cleaned = cleaner.flush()
+            if cleaned:
+                yield "chunk", {"text": cleaned}
+            yield "done", {"cover_letter": clean_cover_letter("".join(parts))}
+        except Exception as e:
+            logger.error(f"Cover letter streaming failed: {str(e)}")
+            yield "error", {"error": str(e)}
+            yield "done", {"cover_letter": generate_fallback_cover_letter()}
+
+    return events()
+
+class _StreamCleaner:
+    """
+    Applies the clean_cover_letter rules to streamed text. Text is released a line at a
+    time, since every rule except code fences works within a line; lines from an open
+    fence onwards are held, as are trailing blank lines so runs of them collapse.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._started = False
+
+    def feed(self, text):
+        self._buffer += text
+        cut = self._buffer.rfind("\n") + 1
+        # Never cut inside a fence: back up to the line the open fence starts on
+        while cut and self._buffer.count("```", 0, cut) % 2:
+            cut = self._buffer.rfind("\n", 0, self._buffer.rfind("```", 0, cut)) + 1
+        if not cut:
+            return ""
+        head = _clean_fragment(self._buffer[:cut])
+        ready = head.rstrip()
+        self._buffer = head[len(ready):] + self._buffer[cut:]
+        return self._emit(ready)
+
+    def flush(self):
+        ready, self._buffer = _clean_fragment(self._buffer).rstrip(), ""
+        return self._emit(ready)
+
+    def _emit(self, text):
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+def _clean_fragment(text):
+    # Remove markdown code blocks
+    text = _CODE_BLOCK.sub('', text)
+
+    # Remove any remaining special tokens
+    text = _EMPHASIS.sub('', text)
+
+    # Ensure proper paragraph breaks
+    text = _BLANK_LINES.sub('\n\n', text)
+
+    # Remove any incomplete placeholder text
+    return _PLACEHOLDER.sub('', text)
+
 def clean_cover_letter(text):
     """Clean and format the generated cover letter"""
     try:
         if not text:
             return generate_fallback_cover_letter()
-            
-        # Remove markdown code blocks
-        text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)
-        
-        # Remove any remaining special tokens
-        text = re.sub(r'[*_]{2,}', '', text)
-        
-        # Ensure proper paragraph breaks
-        text = re.sub(r'\n\s*\n', '\n\n', text)
-        
-        # Remove any incomplete placeholder text
-        text = re.sub(r'\[.*?\]', '', text)
-        
-        return text.strip() or generate_fallback_cover_letter()
+
+        return _clean_fragment(text).strip() or generate_fallback_cover_letter()
         
     except Exception as e:
         logger.error(f"Error cleaning cover letter: {str(e)}")
@@ -1,17 +1,15 @@
 import os
 import re
 import json
-import google.generativeai as genai
 from dotenv import load_dotenv
+from services.llm_gateway import generate
+from utils.response_parser import extract_json_object, find_sections, bullet_items
 
 load_dotenv()
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
 def analyze_feedback(feedback):
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-
         prompt = f"""Analyze the following professional feedback comprehensively:
         {feedback}
 
@@ -33,39 +31,8 @@ def analyze_feedback(feedback):
 
         Ensure the JSON is properly formatted and can be parsed directly."""
 
-        response = model.generate_content(prompt)
-
-        # Try to parse direct JSON response first
-        try:
-            # Clean the response text to extract just the JSON part
-            text = response.text.strip()
-            # Find JSON object boundaries
-            start_idx = text.find('{')
-            end_idx = text.rfind('}') + 1
-
-            if start_idx >= 0 and end_idx > start_idx:
-                json_str = text[start_idx:end_idx]
-                data = json.loads(json_str)
-
-                # Map the JSON fields to our expected output format
-                return {
-                    "sentiment": data.get("Overall Sentiment", "Neutral"),
-                    "sentiment_score": int(data.get("Sentiment Score", 50)),
-                    "key_insights": data.get("Key Insights", []),
-                    "improvement_areas": data.get("Improvement Areas", []),
-                    "recommendations": data.get("Recommendations", "")
-                }
-        except Exception as json_error:
-            print(f"JSON parsing failed: {str(json_error)}. Falling back to extraction methods.")
-
-        # Fallback to extraction methods if JSON parsing fails
-        return {
-            "sentiment": _extract_sentiment(response.text),
-            "sentiment_score": _calculate_sentiment_score(response.text),
-            "key_insights": _extract_key_insights(response.text),
-            "improvement_areas": _extract_improvement_areas(response.text),
-            "recommendations": _extract_recommendations(response.text)
-        }
+        response = generate("feedback", prompt, model_name='gemini-2.0-flash')
+        return parse_feedback_response(response.text).to_dict()
 
     except Exception as e:
         return {
@@ -77,219 +44,192 @@ def analyze_feedback(feedback):
             "recommendations": "Please try again or provide more detailed feedback."
         }
 
-def _extract_sentiment(text):
-    """Extract sentiment from Gemini response"""
-    try:
-        # Try to parse as JSON first
-        if '{' in text and '}' in text:
-            try:
-                # Extract JSON part if it exists
-                json_match = re.search(r'({.*})', text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                    data = json.loads(json_str)
-                    if 'Overall Sentiment' in data:
-                        sentiment = data['Overall Sentiment']
-                        if isinstance(sentiment, str):
-                            if 'positive' in sentiment.lower():
-                                return "Positive"
-                            elif 'negative' in sentiment.lower():
-                                return "Negative"
-                            else:
-                                return "Neutral"
-            except:
-                pass
-
-        # Fallback to text parsing
-        if re.search(r'sentiment.*?positive', text.lower()) or re.search(r'positive.*?sentiment', text.lower()):
-            return "Positive"
-        elif re.search(r'sentiment.*?negative', text.lower()) or re.search(r'negative.*?sentiment', text.lower()):
-            return "Negative"
-        elif re.search(r'sentiment.*?neutral', text.lower()) or re.search(r'neutral.*?sentiment', text.lower()):
-            return "Neutral"
-    except Exception:
-        pass
-
-    # Default fallback
-    return "Neutral"
-
-def _calculate_sentiment_score(text):
-    """Extract sentiment score from Gemini response"""
-    try:
-        # Try to parse as JSON first
-        if '{' in text and '}' in text:
-            try:
-                # Extract JSON part if it exists
-                json_match = re.search(r'({.*})', text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                    data = json.loads(json_str)
-                    if 'Sentiment Score' in data:
-                        score = data['Sentiment Score']
-                        if isinstance(score, (int, float)):
-                            return min(100, max(0, int(score)))
-                        elif isinstance(score, str) and '%' in score:
-                            score_num = int(re.search(r'(\d+)', score).group(1))
-                            return min(100, max(0, score_num))
-            except:
-                pass
-
-        # Fallback to text parsing
-        score_match = re.search(r'sentiment score.*?(\d+)', text.lower()) or re.search(r'score.*?(\d+)%', text.lower())
-        if score_match:
-            return min(100, max(0, int(score_match.group(1))))
-    except Exception:
-        pass
-
-    # Default based on sentiment
-    sentiment = _extract_sentiment(text)
-    if sentiment == "Positive":
-        return 85
-    elif sentiment == "Negative":
-        return 25
-    else:
-        return 50
-
-def _extract_key_insights(text):
-    """Extract key insights from Gemini response"""
-    try:
-        insights = []
-
-        # Try to parse as JSON first
-        if '{' in text and '}' in text:
-            try:
-                # Extract JSON part if it exists
-                json_match = re.search(r'({.*})', text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                    data = json.loads(json_str)
-                    if 'Key Insights' in data:
-                        insights_data = data['Key Insights']
-                        if isinstance(insights_data, list):
-                            return insights_data[:4]  # Limit to 4 insights
-                        elif isinstance(insights_data, str):
-                            return [insights_data]
-            except:
-                pass
-
-        # Fallback to text parsing
-        insights_section = None
-
-        # Look for insights section
-        if 'key insights' in text.lower():
-            insights_section = re.split(r'key insights', text, flags=re.IGNORECASE)[1]
-            insights_section = insights_section.split('\n\n')[0] if '\n\n' in insights_section else insights_section
-
-        if insights_section:
-            # Extract bullet points or numbered items
-            items = re.findall(r'(?:^|\n)(?:\d+\.|\*|\-)\s*(.*?)(?:\n|$)', insights_section)
-            if items:
-                insights = [item.strip() for item in items if item.strip()][:4]  # Limit to 4 insights
-
-        # If we still don't have insights, try to extract sentences
-        if not insights and insights_section:
-            sentences = re.split(r'(?<=[.!?])\s+', insights_section)
-            insights = [s.strip() for s in sentences if len(s.strip()) > 10][:4]  # Limit to 4 insights
-
-        return insights if insights else ["Communication skills", "Technical knowledge", "Professional demeanor"]
-    except Exception:
-        return ["Communication skills", "Technical knowledge", "Professional demeanor"]
-
-def _extract_improvement_areas(text):
-    """Extract improvement areas from Gemini response"""
-    try:
-        areas = []
-
-        # Try to parse as JSON first
-        if '{' in text and '}' in text:
-            try:
-                # Extract JSON part if it exists
-                json_match = re.search(r'({.*})', text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                    data = json.loads(json_str)
-                    if 'Improvement Areas' in data:
-                        areas_data = data['Improvement Areas']
-                        if isinstance(areas_data, list):
-                            return areas_data[:3]  # Limit to 3 areas
-                        elif isinstance(areas_data, str):
-                            return [areas_data]
-            except:
-                pass
-
-        # Fallback to text parsing
-        improvement_section = None
-
-        # Look for improvement section with various possible headings
-        for heading in ['improvement areas', 'areas for improvement', 'improvement suggestions']:
-            if heading in text.lower():
-                improvement_section = re.split(heading, text, flags=re.IGNORECASE)[1]
-                improvement_section = improvement_section.split('\n\n')[0] if '\n\n' in improvement_section else improvement_section
-                break
-
-        if improvement_section:
-            # Extract bullet points or numbered items
-            items = re.findall(r'(?:^|\n)(?:\d+\.|\*|\-)\s*(.*?)(?:\n|$)', improvement_section)
-            if items:
-                areas = [item.strip() for item in items if item.strip()][:3]  # Limit to 3 areas
-
-        # If we still don't have areas, try to extract sentences
-        if not areas and improvement_section:
-            sentences = re.split(r'(?<=[.!?])\s+', improvement_section)
-            areas = [s.strip() for s in sentences if len(s.strip()) > 10][:3]  # Limit to 3 areas
-
-        return areas if areas else ["Technical skills", "Communication clarity", "Professional development"]
-    except Exception:
-        return ["Technical skills", "Communication clarity", "Professional development"]
-
-def _extract_recommendations(text):
-    """Extract recommendations from Gemini response"""
-    try:
-        # Try to parse as JSON first
-        if '{' in text and '}' in text:
-            try:
-                # Extract JSON part if it exists
-                json_match = re.search(r'({.*})', text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                    data = json.loads(json_str)
-                    if 'Recommendations' in data:
-                        recs = data['Recommendations']
-                        if isinstance(recs, list):
-                            return ". ".join(recs)
-                        elif isinstance(recs, str):
-                            return recs
-            except:
-                pass
-
-        # Fallback to text parsing
-        recommendations_section = None
-
-        # Look for recommendations section with various possible headings
-        for heading in ['recommendations', 'actionable recommendations', 'professional recommendations']:
-            if heading in text.lower():
-                recommendations_section = re.split(heading, text, flags=re.IGNORECASE)[1]
-                recommendations_section = recommendations_section.split('\n\n')[0] if '\n\n' in recommendations_section else recommendations_section
-                break
-
-        if recommendations_section:
-            # Clean up the recommendations text
-            recommendations = recommendations_section.strip()
-            # Remove bullet points or numbers
-            recommendations = re.sub(r'(?:^|\n)(?:\d+\.|\*|\-)\s*', ' ', recommendations)
-            # Clean up extra whitespace
-            recommendations = re.sub(r'\s+', ' ', recommendations).strip()
-
-            if len(recommendations) > 10:
-                return recommendations
-
-        # Default recommendation based on sentiment
-        sentiment = _extract_sentiment(text)
-        if sentiment == "Positive":
-            return "Continue building on strengths while addressing minor improvement areas for professional growth."
-        elif sentiment == "Negative":
-            return "Focus on addressing key improvement areas through targeted skill development and seeking mentorship."
-        else:
-            return "Balance maintaining current strengths with developing specific skills to enhance overall professional performance."
-    except Exception:
-        return "Focus on developing technical expertise, enhance presentation skills, and improve collaborative communication."
+
+class FeedbackAnalysis:
+    """Typed result of one feedback analysis response."""
+
+    def __init__(self, sentiment, sentiment_score, key_insights, improvement_areas, recommendations, source):
+        self.sentiment = sentiment              # "Positive", "Neutral" or "Negative"
+        self.sentiment_score = sentiment_score  # 0-100
+        self.key_insights = key_insights        # At most MAX_INSIGHTS strings
+        self.improvement_areas = improvement_areas  # At most MAX_IMPROVEMENT_AREAS strings
+        self.recommendations = recommendations
+        self.source = source  # "json", "text" or "mixed": where the fields were found
+
+    def to_dict(self):
+        return {
+            "sentiment": self.sentiment,
+            "sentiment_score": self.sentiment_score,
+            "key_insights": self.key_insights,
+            "improvement_areas": self.improvement_areas,
+            "recommendations": self.recommendations
+        }
+
+
+MAX_INSIGHTS = 4
+MAX_IMPROVEMENT_AREAS = 3
+
+# JSON keys, lowercased with non-letters removed, -> field
+_JSON_FIELDS = {
+    "overallsentiment": "sentiment",
+    "sentiment": "sentiment",
+    "sentimentscore": "score",
+    "score": "score",
+    "keyinsights": "insights",
+    "insights": "insights",
+    "improvementareas": "areas",
+    "areasforimprovement": "areas",
+    "recommendations": "recommendations",
+    "recommendation": "recommendations"
+}
+# Free-text heading phrases -> field
+_SECTION_HEADINGS = {
+    "key insights": "insights",
+    "improvement areas": "areas",
+    "areas for improvement": "areas",
+    "improvement suggestions": "areas",
+    "recommendations": "recommendations"
+}
+
+_NON_LETTERS = re.compile(r"[^a-z]")
+_SENTIMENT = re.compile(r"sentiment[^\n]*?(positive|negative|neutral)|(positive|negative|neutral)[^\n]*?sentiment")
+_SCORE = re.compile(r"sentiment score\D*?(\d+)|score[^\n]*?(\d+)%")
+_NUMBER = re.compile(r"\d+")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+_BULLET_PREFIX = re.compile(r"(?:^|\n)\s*(?:\d+[.)]|[*\-•])\s*")
+
+_DEFAULT_INSIGHTS = ["Communication skills", "Technical knowledge", "Professional demeanor"]
+_DEFAULT_IMPROVEMENT_AREAS = ["Technical skills", "Communication clarity", "Professional development"]
+_DEFAULT_RECOMMENDATIONS = {
+    "Positive": "Continue building on strengths while addressing minor improvement areas for professional growth.",
+    "Negative": "Focus on addressing key improvement areas through targeted skill development and seeking mentorship.",
+    "Neutral": "Balance maintaining current strengths with developing specific skills to enhance overall professional performance."
+}
+_DEFAULT_SCORES = {"Positive": 85, "Negative": 25, "Neutral": 50}
+
+
+def parse_feedback_response(text):
+    """
+    Build a FeedbackAnalysis from a model response in one pass: the embedded JSON
+    object is extracted once (tolerating the usual breakage), and fields it lacks are
+    read from the response's heading sections, split once, or defaulted.
+    """
+    text = text or ""
+    fields = {}
+    for key, value in (extract_json_object(text) or {}).items():
+        field = _JSON_FIELDS.get(_NON_LETTERS.sub("", str(key).lower()))
+        if field and field not in fields:
+            fields[field] = value
+
+    found_in_json = len(fields)
+    # Heading sections are only needed for list and text fields the JSON did not give
+    needs_sections = not {"insights", "areas", "recommendations"} <= fields.keys()
+    sections = find_sections(text, _SECTION_HEADINGS) if needs_sections else {}
+    lowered = text.lower()
+
+    sentiment = _sentiment(fields.get("sentiment"), lowered)
+    return FeedbackAnalysis(
+        sentiment=sentiment,
+        sentiment_score=_sentiment_score(fields.get("score"), lowered, sentiment),
+        key_insights=_items(fields.get("insights"), sections.get("insights"), MAX_INSIGHTS) or _DEFAULT_INSIGHTS,
+        improvement_areas=_items(fields.get("areas"), sections.get("areas"), MAX_IMPROVEMENT_AREAS) or _DEFAULT_IMPROVEMENT_AREAS,
+        recommendations=_recommendations(fields.get("recommendations"), sections.get("recommendations")) or _DEFAULT_RECOMMENDATIONS[sentiment],
+        source="json" if found_in_json == len(set(_JSON_FIELDS.values())) else ("mixed" if found_in_json else "text")
+    )
+
+
+def _sentiment(value, lowered):
+    if isinstance(value, str):
+        value = value.lower()
+        return "Positive" if "positive" in value else "Negative" if "negative" in value else "Neutral"
+    match = _SENTIMENT.search(lowered)
+    return (match.group(1) or match.group(2)).capitalize() if match else "Neutral"
+
+
+def _sentiment_score(value, lowered, sentiment):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return min(100, max(0, int(value)))
+    if isinstance(value, str) and _NUMBER.search(value):
+        return min(100, max(0, int(_NUMBER.search(value).group(0))))
+    match = _SCORE.search(lowered)
+    if match:
+        return min(100, max(0, int(match.group(1) or match.group(2))))
+    return _DEFAULT_SCORES[sentiment]
+
+
+def _items(value, lines, limit):
+    """A list field from the JSON value, else the section's bullets, else its sentences."""
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()][:limit]
+    if isinstance(value, str) and value.strip():
+        return [value.strip()]
+    if not lines:
+        return []
+    items = bullet_items(lines)
+    if not items:
+        items = [sentence.strip() for sentence in _SENTENCE_BREAK.split(" ".join(lines)) if len(sentence.strip()) > 10]
+    return items[:limit]
+
+
+def _recommendations(value, lines):
+    if isinstance(value, list):
+        return ". ".join(str(item) for item in value)
+    if isinstance(value, str) and value.strip():
+        return value
+    if not lines:
+        return ""
+    recommendations = _BULLET_PREFIX.sub(" ", "\n".join(lines))
+    recommendations = re.sub(r"\s+", " ", recommendations).strip()
+    return recommendations if len(recommendations) > 10 else ""
+
+
+# Fuzz and benchmark the parser over the corpus of malformed responses:
+#   python -m services.feedback_service [corpus] [mutations per response]
+if __name__ == "__main__":
+    import sys
+    import time
+    import random
+
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", "feedback_responses.jsonl")
+    mutations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with open(path, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+
+    failures = 0
+    for case in corpus:
+        result = parse_feedback_response(case["response"]).to_dict()
+        for field, expected in case.get("expected", {}).items():
+            if result[field] != expected:
+                failures += 1
+                print(f"{case['name']}: {field} = {result[field]!r}, expected {expected!r}")
+
+    # Truncate, splice and corrupt each response; the parser must still return a well-formed result
+    rng = random.Random(0)
+    fuzzed = []
+    for case in corpus:
+        response = case["response"]
+        for _ in range(mutations):
+            cut = rng.randrange(len(response) + 1)
+            choice = rng.random()
+            if choice < 0.4:
+                fuzzed.append(response[:cut])
+            elif choice < 0.7:
+                fuzzed.append(response[:cut] + rng.choice(['"', "{", "}", "[", ",", "\n\n", "```"]) + response[cut:])
+            else:
+                fuzzed.append(response[:cut] + response[rng.randrange(cut, len(response) + 1):])
+    for response in fuzzed:
+        analysis = parse_feedback_response(response)
+        if not (analysis.sentiment in _DEFAULT_SCORES and 0 <= analysis.sentiment_score <= 100
+                and isinstance(analysis.key_insights, list) and isinstance(analysis.improvement_areas, list)
+                and isinstance(analysis.recommendations, str)):
+            failures += 1
+            print(f"Malformed result for {response[:80]!r}")
+
+    start_time = time.perf_counter()
+    for response in fuzzed:
+        parse_feedback_response(response)
+    elapsed = time.perf_counter() - start_time
+
+    print(f"{len(corpus)} corpus responses, {len(fuzzed)} mutations, {failures} failures")
+    print(f"{elapsed / len(fuzzed) * 1e6:.1f} us per response")
+    sys.exit(1 if failures else 0)
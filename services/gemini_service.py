@@ -1,38 +1,21 @@
-import os
 import re
-import nltk
-import google.generativeai as genai
 from dotenv import load_dotenv
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+from utils.keyword_extractor import analyze_text
+from utils.text_pipeline import normalize
+from services.llm_gateway import generate
+from services.prompt_compaction_service import compact_prompt_inputs
 
 # 🔐 Load .env variables
 load_dotenv()
 
-# 📡 Get API key from env
-genai_api_key = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=genai_api_key)
-
-# 🔤 Download NLTK resources
-nltk.download('stopwords')
-nltk.download('wordnet')
-
-# ⚙️ NLP setup
-lemmatizer = WordNetLemmatizer()
-stop_words = set(stopwords.words('english'))
-
 def preprocess_text(text):
-    if not text:
-        return ""
-    text = text.lower()
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    words = [lemmatizer.lemmatize(w) for w in text.split() if w not in stop_words]
-    return ' '.join(words)
+    # Same normalization as ATS scoring and keyword extraction
+    return " ".join(normalize(text))
 
 def calculate_fallback_score(resume_text, jd_text):
-    resume_words = set(preprocess_text(resume_text).split())
-    jd_words = set(preprocess_text(jd_text).split())
+    # Accepts raw text or AnalyzedDocuments already built for this request
+    resume_words = set(analyze_text(resume_text).lemmas)
+    jd_words = set(analyze_text(jd_text).lemmas)
     common = resume_words & jd_words
     return round((len(common) / max(len(jd_words), 1)) * 100)
 
@@ -62,9 +45,13 @@ def parse_gemini_response(text, resume_text, jd_text):
     return result
 
 def analyze_resume_with_gemini(resume_text, job_description):
+    # Analyze once; the prompt and the fallback score share the same documents
+    resume_doc = analyze_text(resume_text)
+    jd_doc = analyze_text(job_description)
     try:
-        cleaned_resume = preprocess_text(resume_text)
-        cleaned_jd = preprocess_text(job_description)
+        # The prompt gets the normalized text of the inputs fitted to the token budget,
+        # built from the lemmas already in the analyzed documents
+        cleaned_resume, cleaned_jd = compact_prompt_inputs("resume_analysis", resume_doc, jd_doc, normalized=True)
 
         prompt = f"""Analyze this resume against the job description and provide:
 
@@ -86,21 +73,21 @@ Focus on:
 - Qualifications alignment
 """
 
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        response = model.generate_content(prompt)
+        response = generate("resume_analysis", prompt, model_name="gemini-2.0-flash")
 
         if not hasattr(response, 'text') or not response.text:
             raise ValueError("Empty or invalid response from Gemini API")
 
         print("Gemini raw response:", response.text)
-        return parse_gemini_response(response.text, cleaned_resume, cleaned_jd)
+        return parse_gemini_response(response.text, resume_doc, jd_doc)
 
     except Exception as e:
         print(f"Gemini analysis error: {str(e)}")
         return {
             "keywords": [],
             "suggestions": ["Failed to analyze with AI. Using fallback method."],
-            "match_score": calculate_fallback_score(resume_text, job_description)
+            "match_score": calculate_fallback_score(resume_doc, jd_doc),
+            "fallback": True
         }
 
 # 🧪 Example usage
@@ -1,5 +1,4 @@
 import requests
-import google.generativeai as genai
 import os
 import json
 import time
@@ -8,19 +7,24 @@ from io import BytesIO
 from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
 from models.resume_model import Resume
-from services.ats_score_service import calculate_ats_score
-from utils.file_parser import parse_resume_file
-from utils.keyword_extractor import extract_keywords
+from concurrent.futures import ThreadPoolExecutor
+from services.ats_score_service import calculate_ats_score, calculate_ats_scores
+from services.llm_gateway import generate
+from services.prompt_compaction_service import compact_prompt_inputs
+from services.resume_cache_service import load_resume_artifacts
+from utils.keyword_extractor import extract_keywords, AnalyzedDocument
+from services.skill_taxonomy_service import match_skills, match_skills_bulk
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
 # SerpAPI configuration
 SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY")
 
+# Jobs per match request analyzed by Gemini after local ranking, and how many at once
+JOB_MATCH_TOP_K = int(os.getenv("JOB_MATCH_TOP_K", 5))
+JOB_MATCH_CONCURRENCY = int(os.getenv("JOB_MATCH_CONCURRENCY", 4))
+
 def fetch_jobs(query, location="India"):
     """ Fetch job listings using SerpAPI. """
     try:
@@ -38,11 +42,10 @@ def fetch_jobs(query, location="India"):
         print(f"Error fetching jobs: {e}")
         return []
 
-def analyze_resume_with_gemini(resume_text, job_description):
-    """Analyze resume against job description using Gemini API."""
-    try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        prompt = f"""
+def _gemini_match(resume_text, job_description):
+    """One Gemini match analysis; raises when the call or its JSON fails."""
+    resume_text, job_description = compact_prompt_inputs("job_matching", resume_text, job_description)
+    prompt = f"""
         Analyze this resume: {resume_text}
         Against this job description: {job_description}
         Provide the following in JSON format:
@@ -53,19 +56,27 @@ def analyze_resume_with_gemini(resume_text, job_description):
             "recommendation": "Your recommendation here"
         }}
         """
-        start_time = time.time()
-        response = model.generate_content(prompt)
-        end_time = time.time()
-        print(f"Time taken for Gemini API call: {end_time - start_time:.2f} seconds")
-        
-        # Check if the response is valid
-        if not response.text:
-            raise ValueError("Empty response from Gemini API")
-        
-        # Safely parse JSON response
-        result = json.loads(response.text)
-        print(f"Gemini API response: {result}")
-        return result
+    start_time = time.time()
+    response = generate("job_matching", prompt, model_name="gemini-2.0-flash")
+    end_time = time.time()
+    print(f"Time taken for Gemini API call: {end_time - start_time:.2f} seconds")
+    
+    # Check if the response is valid
+    if not response.text:
+        raise ValueError("Empty response from Gemini API")
+    
+    # Safely parse JSON response
+    result = json.loads(response.text)
+    print(f"Gemini API response: {result}")
+    if not isinstance(result, dict):
+        # Valid JSON, but a list/string/number; callers fall back to the local score
+        raise ValueError("Gemini response is not a JSON object")
+    return result
+
+def analyze_resume_with_gemini(resume_text, job_description):
+    """Analyze resume against job description using Gemini API."""
+    try:
+        return _gemini_match(resume_text, job_description)
     except Exception as e:
         print(f"Error analyzing resume with Gemini: {e}")
         return {
@@ -75,13 +86,76 @@ def analyze_resume_with_gemini(resume_text, job_description):
             "recommendation": "Unable to analyze resume."
         }
 
+def _job_url(job):
+    return job.get("related_links", [{}])[0].get("link", "") if job.get("related_links") else ""
+
+def rank_jobs_locally(resume_doc, jd_docs):
+    """
+    Score every job without the LLM: the ATS score of the resume against the job
+    description averaged with the share of the job's dictionary skills the resume has.
+    Returns one dict per job, in input order, with local_score and the skill match.
+    """
+    ats_scores = calculate_ats_scores(resume_doc, jd_docs)
+    skill_matches = match_skills_bulk(resume_doc, jd_docs)
+    ranked = []
+    for ats_score, skill_match in zip(ats_scores, skill_matches):
+        required = len(skill_match["matched_skills"]) + len(skill_match["missing_skills"])
+        if required:
+            local_score = (ats_score + 100 * len(skill_match["matched_skills"]) / required) / 2
+        else:
+            local_score = ats_score
+        ranked.append(dict(skill_match, ats_score=ats_score, local_score=round(local_score, 2)))
+    return ranked
+
+def match_resume_to_jobs(resume_doc, jobs, top_k=JOB_MATCH_TOP_K):
+    """
+    Two-phase job matching. All jobs are ranked locally first; only the top_k go to
+    Gemini, at most JOB_MATCH_CONCURRENCY at a time. Every job comes back with
+    score_source "llm" or "local"; jobs outside the top_k, and top jobs whose Gemini
+    analysis failed, carry their local score and skill match. Sorted by score.
+    """
+    jd_docs = [AnalyzedDocument(job.get("description", "")) for job in jobs]
+    local_results = rank_jobs_locally(resume_doc, jd_docs)
+    order = sorted(range(len(jobs)), key=lambda i: local_results[i]["local_score"], reverse=True)
+    top = order[:top_k]
+
+    llm_results = {}
+    if top:
+        with ThreadPoolExecutor(max_workers=JOB_MATCH_CONCURRENCY, thread_name_prefix="job-match") as executor:
+            futures = {i: executor.submit(_gemini_match, resume_doc.text, jd_docs[i].text) for i in top}
+            for i, future in futures.items():
+                try:
+                    llm_results[i] = future.result()
+                except Exception as e:
+                    print(f"Error analyzing resume with Gemini: {e}")
+
+    matched_jobs = []
+    for i in order:
+        job, local = jobs[i], local_results[i]
+        llm = llm_results.get(i)
+        matched_jobs.append({
+            "title": job.get("title", ""),
+            "company": job.get("company_name", ""),
+            "location": job.get("location", ""),
+            "matching_score": llm.get("matching_score", 0) if llm else local["local_score"],
+            "local_score": local["local_score"],
+            "score_source": "llm" if llm else "local",
+            "matched_skills": llm.get("matched_skills", []) if llm else local["matched_skills"],
+            "missing_skills": llm.get("missing_skills", []) if llm else local["missing_skills"],
+            "recommendation": llm.get("recommendation", "") if llm else "",
+            "url": _job_url(job)
+        })
+    matched_jobs.sort(key=lambda job: (job["score_source"] == "llm", job["matching_score"]), reverse=True)
+    return matched_jobs
+
 def analyze_resume(user_id, file, job_description):
     try:
-        # Parse the resume file (PDF/DOCX)
-        resume_text = parse_resume_file(file)
-        if not resume_text:
+        # Parse the resume file (PDF/DOCX) once per distinct upload
+        artifacts = load_resume_artifacts(file)
+        if not artifacts:
             print("Error: Failed to parse resume file")
             return {"error": "Failed to parse resume file"}, 400
+        resume_text = artifacts.resume_text
         
         print(f"Parsed resume text: {resume_text[:100]}...")  # Print first 100 characters of resume text
         
@@ -89,21 +163,28 @@ def analyze_resume(user_id, file, job_description):
         analysis_result = analyze_resume_with_gemini(resume_text, job_description)
         print(f"Analysis result: {analysis_result}")
         
+        # Analyze each text once for ATS scoring and keyword extraction
+        resume_doc = artifacts.document
+        jd_doc = AnalyzedDocument(job_description)
+
         # Calculate the ATS score
-        ats_score = calculate_ats_score(resume_text, job_description)
+        ats_score = calculate_ats_score(resume_doc, jd_doc)
         print(f"Calculated ATS score: {ats_score}")
         
         # Extract keywords from the resume and job description
-        resume_keywords = extract_keywords(resume_text)
-        job_keywords = extract_keywords(job_description)
+        resume_keywords = artifacts.keywords
+        job_keywords = extract_keywords(jd_doc, mode="ngram")
+
+        # Deterministic matched/missing skills, independent of the Gemini JSON parse
+        skill_match = match_skills(resume_doc, jd_doc)
         
         # Format the response
         response = {
             "ats_score": ats_score,
             "keywords": list(set(resume_keywords) & set(job_keywords)),  # Intersection of resume and job keywords
             "suggestions": analysis_result.get("suggestions", []),  # Ensure suggestions is an array
-            "matched_skills": analysis_result.get("matched_skills", []),
-            "missing_skills": analysis_result.get("missing_skills", []),
+            "matched_skills": skill_match["matched_skills"],
+            "missing_skills": skill_match["missing_skills"],
             "recommendation": analysis_result.get("recommendation", "")
         }
         
@@ -0,0 +1,153 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join("data", "llm_cache.sqlite3"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+_DAY = 24 * 60 * 60
+# Seconds a cached answer stays valid per endpoint; endpoints not listed (or None) are
+# never cached, e.g. cover letters, which are sampled at temperature 0.7 on purpose
+ENDPOINT_TTLS = {
+    "resume_analysis": 7 * _DAY,
+    "job_matching": 7 * _DAY,
+    "course_recommendation": 7 * _DAY,
+    "feedback": 1 * _DAY,
+    "chatbot": 1 * _DAY,
+    "cover_letter": None
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def cache_key(model_name, generation_config, safety_settings, prompt):
+    """Hash of the model settings and the whitespace-normalized prompt."""
+    normalized_prompt = _WHITESPACE.sub(" ", prompt).strip()
+    payload = json.dumps([model_name, generation_config, safety_settings, normalized_prompt], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    """Stands in for an SDK response served from the cache; callers only read .text."""
+
+    usage_metadata = None
+
+    def __init__(self, text):
+        self.text = text
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed cache of LLM response texts with per-endpoint TTLs. When the stored
+    responses exceed max_bytes the least recently used ones are evicted.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._connection = None
+        self._pid = None
+        self._bytes = None
+        self._lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+
+    def _db(self):
+        # One connection per process; forked workers open their own
+        if self._connection is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, endpoint TEXT, response TEXT, size INTEGER, "
+                "created_at REAL, accessed_at REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            self._connection, self._pid = connection, os.getpid()
+            self._bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        return self._connection
+
+    def get(self, endpoint, key):
+        ttl = ENDPOINT_TTLS.get(endpoint)
+        if not ttl:
+            return None
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._db()
+                row = db.execute(
+                    "SELECT response FROM responses WHERE key = ? AND created_at >= ?", (key, now - ttl)
+                ).fetchone()
+                if row:
+                    db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                    db.commit()
+                counter = self.hits if row else self.misses
+                counter[endpoint] = counter.get(endpoint, 0) + 1
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache lookup failed: {str(e)}")
+            return None
+        return row[0] if row else None
+
+    def put(self, endpoint, key, text):
+        if not ENDPOINT_TTLS.get(endpoint) or not text:
+            return
+        now = time.time()
+        size = len(text.encode("utf-8"))
+        try:
+            with self._lock:
+                db = self._db()
+                previous = db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, endpoint, text, size, now, now)
+                )
+                self._bytes += size - (previous[0] if previous else 0)
+                if self._bytes > self.max_bytes:
+                    self._evict(db)
+                db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache write failed: {str(e)}")
+
+    def _evict(self, db):
+        """Drop least recently used responses until the store is 10% under its bound."""
+        target = self.max_bytes * 0.9
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if self._bytes <= target:
+                break
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._bytes -= size
+
+    def stats(self):
+        with self._lock:
+            endpoints = set(self.hits) | set(self.misses)
+            return {
+                "bytes": self._bytes or 0,
+                "max_bytes": self.max_bytes,
+                "endpoints": {
+                    endpoint: {
+                        "hits": self.hits.get(endpoint, 0),
+                        "misses": self.misses.get(endpoint, 0),
+                        "hit_rate": round(
+                            self.hits.get(endpoint, 0)
+                            / (self.hits.get(endpoint, 0) + self.misses.get(endpoint, 0)), 4
+                        )
+                    }
+                    for endpoint in endpoints
+                }
+            }
+
+
+llm_cache = LLMResponseCache()
+
+
+def get_llm_cache_stats():
+    return llm_cache.stats()
@@ -0,0 +1,380 @@
+import os
+import time
+import logging
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+from services.llm_cache import llm_cache, cache_key, CachedResponse, LLM_CACHE_ENABLED
+from services.llm_providers import create_provider
+from services.circuit_breaker import CircuitBreaker
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+# Calls in flight to Gemini across the process, and per endpoint unless overridden below
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+LLM_ENDPOINT_CONCURRENCY = int(os.getenv("LLM_ENDPOINT_CONCURRENCY", 8))
+ENDPOINT_CONCURRENCY = {
+    "cover_letter": int(os.getenv("LLM_COVER_LETTER_CONCURRENCY", 4))
+}
+# Seconds a call may wait for a free slot, and seconds it may then take
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 10))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 30))
+# Endpoints with short analysis prompts whose slow calls are hedged with a second copy,
+# and seconds before hedging (0: the endpoint's recent p95 latency)
+LLM_HEDGE_ENDPOINTS = set(filter(None, os.getenv("LLM_HEDGE_ENDPOINTS", "resume_analysis,job_matching,feedback").split(",")))
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", 0))
+_HEDGE_DEFAULT_DELAY = 3.0
+_HEDGE_MIN_SAMPLES = 20
+
+# Latency samples kept per endpoint for percentiles
+_SAMPLE_SIZE = 500
+
+
+class LLMBusyError(RuntimeError):
+    """No concurrency slot became free within the queue timeout."""
+
+
+class LLMTimeoutError(TimeoutError):
+    """The model did not answer within the call timeout."""
+
+
+class LLMUnavailableError(RuntimeError):
+    """The endpoint's circuit breaker is open; callers should fall back without waiting."""
+
+
+class _EndpointMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.short_circuited = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.abandoned = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.latencies = deque(maxlen=_SAMPLE_SIZE)
+        self.queue_waits = deque(maxlen=_SAMPLE_SIZE)
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3) if latencies else None
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "short_circuited": self.short_circuited,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "abandoned": self.abandoned,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "queue_wait_max": round(max(self.queue_waits), 3) if self.queue_waits else None
+        }
+
+
+class LLMGateway:
+    """
+    The one place that talks to the LLM backend (Gemini unless LLM_PROVIDER says
+    otherwise): bounds concurrency globally and per endpoint, trips a circuit breaker per
+    model/endpoint, applies call timeouts, hedges slow short calls and records latency
+    and token metrics.
+    """
+
+    def __init__(self, provider=None):
+        self.provider = provider or create_provider()
+        self._lock = threading.Lock()
+        self._global_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+        self._endpoint_slots = {}
+        self._metrics = {}
+        self._breakers = {}  # "<model>:<endpoint>" -> CircuitBreaker
+        # Calls run here so a timed-out call frees the request thread immediately
+        self._executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+
+    def _endpoint(self, endpoint):
+        with self._lock:
+            if endpoint not in self._endpoint_slots:
+                limit = ENDPOINT_CONCURRENCY.get(endpoint, LLM_ENDPOINT_CONCURRENCY)
+                self._endpoint_slots[endpoint] = threading.BoundedSemaphore(limit)
+                self._metrics[endpoint] = _EndpointMetrics()
+            return self._endpoint_slots[endpoint], self._metrics[endpoint]
+
+    def _acquire(self, endpoint_slots, metrics):
+        """Wait in line for an endpoint slot and then a global slot."""
+        start_time = time.monotonic()
+        with self._lock:
+            metrics.waiting += 1
+        try:
+            if not endpoint_slots.acquire(timeout=LLM_QUEUE_TIMEOUT):
+                return False
+            remaining = LLM_QUEUE_TIMEOUT - (time.monotonic() - start_time)
+            if not self._global_slots.acquire(timeout=max(0, remaining)):
+                endpoint_slots.release()
+                return False
+            return True
+        finally:
+            with self._lock:
+                metrics.waiting -= 1
+                metrics.queue_waits.append(time.monotonic() - start_time)
+
+    def _breaker(self, model_name, endpoint):
+        key = f"{model_name}:{endpoint}"
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker()
+            return breaker
+
+    def _admit(self, model_name, endpoint):
+        """Pass the endpoint's circuit breaker and queue, or raise; returns (breaker, slots, metrics)."""
+        endpoint_slots, metrics = self._endpoint(endpoint)
+        breaker = self._breaker(model_name, endpoint)
+        if not breaker.allow():
+            with self._lock:
+                metrics.short_circuited += 1
+            raise LLMUnavailableError(f"Circuit for '{endpoint}' on {model_name} is open")
+
+        if not self._acquire(endpoint_slots, metrics):
+            breaker.abandon()
+            with self._lock:
+                metrics.rejected += 1
+            raise LLMBusyError(f"LLM queue for '{endpoint}' is full")
+        return breaker, endpoint_slots, metrics
+
+    def _submit(self, endpoint_slots, metrics, endpoint, prompt, model_name, generation_config, safety_settings):
+        """Run one backend call on the executor; the caller has acquired its slots."""
+        with self._lock:
+            metrics.in_flight += 1
+
+        def call():
+            try:
+                return self.provider.generate(endpoint, prompt, model_name, generation_config, safety_settings)
+            finally:
+                # Slots are held until the backend call really ends, even after a timeout
+                self._global_slots.release()
+                endpoint_slots.release()
+                with self._lock:
+                    metrics.in_flight -= 1
+
+        return self._executor.submit(call)
+
+    def _hedge_delay(self, metrics):
+        if LLM_HEDGE_DELAY > 0:
+            return LLM_HEDGE_DELAY
+        with self._lock:
+            latencies = sorted(metrics.latencies)
+        if len(latencies) < _HEDGE_MIN_SAMPLES:
+            return _HEDGE_DEFAULT_DELAY
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+    def _try_hedge(self, endpoint_slots, metrics, *call):
+        """Start a second copy of a slow call if slots are free right now, else None."""
+        if not endpoint_slots.acquire(blocking=False):
+            return None
+        if not self._global_slots.acquire(blocking=False):
+            endpoint_slots.release()
+            return None
+        with self._lock:
+            metrics.hedged += 1
+        return self._submit(endpoint_slots, metrics, *call)
+
+    def generate(self, endpoint, prompt, model_name=DEFAULT_MODEL, generation_config=None,
+                 safety_settings=None, timeout=None, cache=True, hedge=None):
+        """
+        Run the prompt for an endpoint and return the backend's response, or a
+        CachedResponse when the same prompt was answered recently. Pass cache=False to
+        always call the model. When hedging (by default for LLM_HEDGE_ENDPOINTS), a call
+        still running after the hedge delay is raced against a second copy. Raises
+        LLMUnavailableError when the endpoint's circuit is open, LLMBusyError when the
+        queue is full and LLMTimeoutError when the call is too slow.
+        """
+        key = None
+        if cache and LLM_CACHE_ENABLED:
+            key = cache_key(model_name, generation_config, safety_settings, prompt)
+            cached_text = llm_cache.get(endpoint, key)
+            if cached_text is not None:
+                return CachedResponse(cached_text)
+
+        breaker, endpoint_slots, metrics = self._admit(model_name, endpoint)
+        with self._lock:
+            metrics.calls += 1
+        start_time = time.monotonic()
+        deadline = start_time + (timeout or LLM_TIMEOUT)
+        call = (endpoint, prompt, model_name, generation_config, safety_settings)
+        first = self._submit(endpoint_slots, metrics, *call)
+        if hedge is None:
+            hedge = endpoint in LLM_HEDGE_ENDPOINTS
+        hedge_at = start_time + self._hedge_delay(metrics) if hedge else None
+
+        pending = {first}
+        error = None
+        response = winner = None
+        try:
+            while pending and winner is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMTimeoutError(f"LLM call for '{endpoint}' timed out")
+                wait_time = remaining if hedge_at is None else min(remaining, max(0, hedge_at - time.monotonic()))
+                done, pending = wait(pending, timeout=wait_time, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        response, winner = future.result(), future
+                        break
+                    error = future.exception()
+                if winner is None and hedge_at is not None and pending and time.monotonic() >= hedge_at:
+                    hedge_at = None
+                    hedged = self._try_hedge(endpoint_slots, metrics, *call)
+                    if hedged is not None:
+                        pending.add(hedged)
+            if winner is None:
+                raise error
+        except LLMTimeoutError:
+            breaker.record(False, time.monotonic() - start_time)
+            with self._lock:
+                metrics.timeouts += 1
+            raise
+        except Exception:
+            breaker.record(False, time.monotonic() - start_time)
+            with self._lock:
+                metrics.errors += 1
+            raise
+
+        latency = time.monotonic() - start_time
+        breaker.record(True, latency)
+        usage = getattr(response, "usage_metadata", None)
+        with self._lock:
+            metrics.latencies.append(latency)
+            if winner is not first:
+                metrics.hedge_wins += 1
+            if usage is not None:
+                metrics.prompt_tokens += getattr(usage, "prompt_token_count", 0) or 0
+                metrics.output_tokens += getattr(usage, "candidates_token_count", 0) or 0
+
+        if key is not None:
+            try:
+                llm_cache.put(endpoint, key, response.text)
+            except ValueError:
+                pass  # Blocked or empty candidates have no text to cache
+        return response
+
+    def generate_stream(self, endpoint, prompt, model_name=DEFAULT_MODEL, generation_config=None,
+                        safety_settings=None, timeout=None, cache=True):
+        """
+        Yield response text chunks as the model streams them. The timeout applies to the
+        wait for each chunk; a cached answer is yielded as a single chunk.
+        """
+        key = None
+        if cache and LLM_CACHE_ENABLED:
+            key = cache_key(model_name, generation_config, safety_settings, prompt)
+            cached_text = llm_cache.get(endpoint, key)
+            if cached_text is not None:
+                yield cached_text
+                return
+
+        breaker, endpoint_slots, metrics = self._admit(model_name, endpoint)
+        with self._lock:
+            metrics.calls += 1
+            metrics.in_flight += 1
+        start_time = time.monotonic()
+        chunks = queue.Queue()
+        finished = object()
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for text in self.provider.stream(endpoint, prompt, model_name, generation_config, safety_settings):
+                    if stop.is_set():
+                        return
+                    chunks.put(text)
+                chunks.put(finished)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                self._global_slots.release()
+                endpoint_slots.release()
+                with self._lock:
+                    metrics.in_flight -= 1
+
+        self._executor.submit(produce)
+        parts = []
+        item = None
+        ended = False
+        try:
+            while True:
+                try:
+                    item = chunks.get(timeout=timeout or LLM_TIMEOUT)
+                except queue.Empty:
+                    ended = True
+                    breaker.record(False, time.monotonic() - start_time)
+                    with self._lock:
+                        metrics.timeouts += 1
+                    raise LLMTimeoutError(f"LLM stream for '{endpoint}' stalled")
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    ended = True
+                    breaker.record(False, time.monotonic() - start_time)
+                    with self._lock:
+                        metrics.errors += 1
+                    raise item
+                parts.append(item)
+                yield item
+        finally:
+            if not ended and item is not finished:
+                # The consumer stopped reading (e.g. the client went away): stop the
+                # producer and settle the breaker so a half-open probe is not held forever
+                stop.set()
+                with self._lock:
+                    metrics.abandoned += 1
+                if parts:
+                    breaker.record(True, time.monotonic() - start_time)  # The backend was answering
+                else:
+                    breaker.abandon()
+
+        latency = time.monotonic() - start_time
+        breaker.record(True, latency)
+        with self._lock:
+            metrics.latencies.append(latency)
+        if key is not None:
+            llm_cache.put(endpoint, key, "".join(parts))
+
+    def metrics(self):
+        with self._lock:
+            endpoints = {endpoint: metrics.snapshot() for endpoint, metrics in self._metrics.items()}
+            breakers = dict(self._breakers)
+        return {
+            "provider": self.provider.name,
+            "endpoints": endpoints,
+            "breakers": {key: breaker.snapshot() for key, breaker in breakers.items()}
+        }
+
+
+gateway = LLMGateway()
+
+
+def generate(endpoint, prompt, **kwargs):
+    return gateway.generate(endpoint, prompt, **kwargs)
+
+
+def generate_stream(endpoint, prompt, **kwargs):
+    return gateway.generate_stream(endpoint, prompt, **kwargs)
+
+
+def get_llm_metrics():
+    return gateway.metrics()
@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from services.llm_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+# Which backend the gateway talks to: "gemini", "fake", "record" or "replay"
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+# Where the record/replay backend keeps responses, one JSON file per call
+LLM_RECORDINGS_DIR = os.getenv("LLM_RECORDINGS_DIR", os.path.join("data", "llm_recordings"))
+# Fake backend latency, "<seconds>" or "<distribution>:<params>", e.g. "uniform:0.2,1.5" or
+# "lognormal:-0.5,0.6"; LLM_FAKE_LATENCY_<ENDPOINT> overrides it for one endpoint
+LLM_FAKE_LATENCY = os.getenv("LLM_FAKE_LATENCY", "0")
+# Share of fake calls that raise, to exercise error handling and fallbacks
+LLM_FAKE_ERROR_RATE = float(os.getenv("LLM_FAKE_ERROR_RATE", 0))
+
+# Words per chunk when the fake and replay backends stream
+_STREAM_CHUNK_WORDS = 8
+
+
+def _chunks(text):
+    """Split text into stream chunks of a few words each."""
+    words = text.split(" ")
+    for start in range(0, len(words), _STREAM_CHUNK_WORDS):
+        end = start + _STREAM_CHUNK_WORDS
+        yield " ".join(words[start:end]) + (" " if end < len(words) else "")
+
+
+class TextResponse:
+    """A response from a non-SDK backend; mirrors the .text and .usage_metadata callers read."""
+
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class GeminiProvider:
+    """The real backend: one google.generativeai model instance per configuration."""
+
+    name = "gemini"
+
+    def __init__(self):
+        self._configured = False
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def get_model(self, model_name, generation_config=None, safety_settings=None):
+        import google.generativeai as genai
+
+        key = json.dumps([model_name, generation_config, safety_settings], sort_keys=True, default=str)
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                if not self._configured:
+                    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                    self._configured = True
+                model = self._models.get(key)
+                if model is None:
+                    model = self._models[key] = genai.GenerativeModel(
+                        model_name,
+                        generation_config=generation_config,
+                        safety_settings=safety_settings
+                    )
+        return model
+
+    def generate(self, endpoint, prompt, model_name, generation_config=None, safety_settings=None):
+        return self.get_model(model_name, generation_config, safety_settings).generate_content(prompt)
+
+    def stream(self, endpoint, prompt, model_name, generation_config=None, safety_settings=None):
+        model = self.get_model(model_name, generation_config, safety_settings)
+        for chunk in model.generate_content(prompt, stream=True):
+            # Safety-blocked and finish-only chunks have no parts, and .text raises on them
+            if chunk.parts and chunk.text:
+                yield chunk.text
+
+
+def _parse_latency(spec):
+    """Turn a latency spec into a function rng -> seconds."""
+    distribution, _, params = spec.partition(":")
+    if not params:
+        seconds = float(distribution)
+        return lambda rng: seconds
+    values = [float(value) for value in params.split(",")]
+    if distribution == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if distribution == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if distribution == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency distribution '{distribution}'")
+
+
+class FakeProvider:
+    """
+    Deterministic local stand-in. The same prompt always gets the same answer and the
+    same simulated latency; answers are templated in the format each endpoint parses.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency=LLM_FAKE_LATENCY, error_rate=LLM_FAKE_ERROR_RATE):
+        self._default_latency = _parse_latency(latency)
+        self._latencies = {}
+        self.error_rate = error_rate
+
+    def _latency(self, endpoint):
+        if endpoint not in self._latencies:
+            spec = os.getenv(f"LLM_FAKE_LATENCY_{endpoint.upper()}")
+            self._latencies[endpoint] = _parse_latency(spec) if spec else self._default_latency
+        return self._latencies[endpoint]
+
+    def _answer(self, endpoint, prompt):
+        """(rng, text) for a prompt; sleeps for the simulated latency and may fail."""
+        seed = hashlib.sha256(f"{endpoint}\n{prompt}".encode("utf-8")).digest()
+        rng = random.Random(seed)
+        time.sleep(self._latency(endpoint)(rng))
+        if rng.random() < self.error_rate:
+            raise RuntimeError(f"Simulated LLM failure for '{endpoint}'")
+        return rng, _FAKE_TEMPLATES.get(endpoint, _fake_chatbot)(prompt, rng)
+
+    def generate(self, endpoint, prompt, model_name, generation_config=None, safety_settings=None):
+        _, text = self._answer(endpoint, prompt)
+        return TextResponse(text)
+
+    def stream(self, endpoint, prompt, model_name, generation_config=None, safety_settings=None):
+        rng, text = self._answer(endpoint, prompt)
+        for index, chunk in enumerate(_chunks(text)):
+            if index:
+                time.sleep(rng.uniform(0.005, 0.02))
+            yield chunk
+
+
+def _prompt_skills(prompt, rng, count):
+    from utils.skill_matcher import find_skills
+
+    skills = sorted(find_skills(prompt))
+    rng.shuffle(skills)
+    return skills[:count]
+
+
+def _fake_resume_analysis(prompt, rng):
+    keywords = _prompt_skills(prompt, rng, 8) or ["communication", "teamwork"]
+    return (
+        f"KEYWORDS: {', '.join(keywords)}\n"
+        "SUGGESTIONS:\n"
+        "1. Quantify the impact of your most recent role with metrics.\n"
+        "2. Move the skills that match the job description to the top of the skills section.\n"
+        "3. Add a project that uses the job's core technology.\n"
+        f"SCORE: {rng.randint(35, 95)}"
+    )
+
+
+def _fake_job_matching(prompt, rng):
+    skills = _prompt_skills(prompt, rng, 6)
+    return json.dumps({
+        "matching_score": rng.randint(30, 95),
+        "matched_skills": skills[:4],
+        "missing_skills": skills[4:],
+        "recommendation": "Highlight the overlapping experience in your summary and close the missing skill gaps."
+    })
+
+
+def _fake_feedback(prompt, rng):
+    sentiment = rng.choice(["Positive", "Neutral", "Negative"])
+    return json.dumps({
+        "Overall Sentiment": sentiment,
+        "Sentiment Score": {"Positive": rng.randint(70, 95), "Neutral": rng.randint(40, 69), "Negative": rng.randint(5, 39)}[sentiment],
+        "Key Insights": ["Delivers reliable work", "Communicates progress clearly", "Responds well to review"],
+        "Improvement Areas": ["Estimation of larger tasks", "Proactive knowledge sharing"],
+        "Recommendations": "Break large tasks into smaller estimates and share learnings in team sessions."
+    })
+
+
+def _fake_course_recommendation(prompt, rng):
+    skills = _prompt_skills(prompt, rng, 3) or ["professional skills"]
+    return json.dumps({"courses": [
+        {
+            "title": f"{skill.title()} in Practice",
+            "platform": rng.choice(["Coursera", "Udemy", "edX"]),
+            "description": f"Hands-on course deepening {skill} for working professionals",
+            "skill_category": "Technical Skills",
+            "duration": f"{rng.randint(2, 8)} weeks",
+            "url": f"https://example.com/courses/{skill.replace(' ', '-')}"
+        }
+        for skill in skills
+    ]})
+
+
+def _fake_cover_letter(prompt, rng):
+    skills = _prompt_skills(prompt, rng, 3) or ["problem solving"]
+    return (
+        "Dear Hiring Manager,\n\n"
+        "I am writing to apply for this position. The role's focus matches the work I have done "
+        f"over the past {rng.randint(2, 8)} years, and I would welcome the chance to contribute to your team.\n\n"
+        f"In my recent roles I relied on {', '.join(skills)} to deliver projects on schedule, "
+        "working closely with product and engineering colleagues to turn requirements into shipped features.\n\n"
+        "I am particularly drawn to your team's emphasis on quality and ownership, and I am confident "
+        "my experience would let me make an impact quickly.\n\n"
+        "Thank you for your time and consideration. I look forward to discussing the role with you.\n\n"
+        "Sincerely,\nThe Applicant"
+    )
+
+
+def _fake_chatbot(prompt, rng):
+    return (
+        "## Career advice\n"
+        "Focus on one skill at a time and build a small project around it.\n\n"
+        "## ATS tips\n"
+        "- Mirror the job description's keywords in your skills section\n"
+        "- Use standard section headings\n\n"
+        "## Free resources\n"
+        "- https://youtube.com/playlist?list=PL9gnSGHSqcnr_DxHsP7AW9ftq0AtAyYqJ\n\n"
+        "## Keep going\n"
+        "Every application teaches you something. You've got this!"
+    )
+
+
+_FAKE_TEMPLATES = {
+    "resume_analysis": _fake_resume_analysis,
+    "job_matching": _fake_job_matching,
+    "feedback": _fake_feedback,
+    "course_recommendation": _fake_course_recommendation,
+    "cover_letter": _fake_cover_letter,
+    "chatbot": _fake_chatbot
+}
+
+
+class RecordReplayProvider:
+    """
+    Record mode passes calls through to another backend and saves each response under
+    <directory>/<endpoint>/<key>.json, keyed like the response cache. Replay mode serves
+    only those files and raises LookupError for a call that was never recorded.
+    """
+
+    def __init__(self, mode, directory=LLM_RECORDINGS_DIR, backend=None):
+        self.name = mode
+        self.mode = mode
+        self.directory = directory
+        self.backend = backend
+
+    def _path(self, endpoint, prompt, model_name, generation_config, safety_settings):
+        key = cache_key(model_name, generation_config, safety_settings, prompt)
+        return os.path.join(self.directory, endpoint, f"{key}.json")
+
+    def _load(self, path, endpoint):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)["text"]
+        except FileNotFoundError:
+            raise LookupError(f"No recorded '{endpoint}' response at {path}")
+
+    def _save(self, path, endpoint, prompt, model_name, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"endpoint": endpoint, "model": model_name, "prompt": prompt, "text": text}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def generate(self, endpoint, prompt, model_name, generation_config=None, safety_settings=None):
+        path = self._path(endpoint, prompt, model_name, generation_config, safety_settings)
+        if self.mode == "replay":
+            return TextResponse(self._load(path, endpoint))
+        response = self.backend.generate(endpoint, prompt, model_name, generation_config, safety_settings)
+        try:
+            self._save(path, endpoint, prompt, model_name, response.text)
+        except ValueError:
+            pass  # Blocked responses have no text to record
+        return response
+
+    def stream(self, endpoint, prompt, model_name, generation_config=None, safety_settings=None):
+        path = self._path(endpoint, prompt, model_name, generation_config, safety_settings)
+        if self.mode == "replay":
+            yield from _chunks(self._load(path, endpoint))
+            return
+        parts = []
+        for text in self.backend.stream(endpoint, prompt, model_name, generation_config, safety_settings):
+            parts.append(text)
+            yield text
+        self._save(path, endpoint, prompt, model_name, "".join(parts))
+
+
+def create_provider(name=LLM_PROVIDER):
+    """The backend named by LLM_PROVIDER."""
+    if name == "gemini":
+        return GeminiProvider()
+    if name == "fake":
+        return FakeProvider()
+    if name == "record":
+        return RecordReplayProvider("record", backend=GeminiProvider())
+    if name == "replay":
+        return RecordReplayProvider("replay")
+    raise ValueError(f"Unknown LLM provider '{name}'")
@@ -0,0 +1,277 @@
+import os
+import re
+import math
+import logging
+import threading
+from utils.keyword_extractor import AnalyzedDocument, analyze_text
+from utils.skill_matcher import find_sections
+from utils.nltk_resources import get_stop_words
+from utils.text_pipeline import normalize, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Token budget for the documents embedded in each endpoint's prompt (the fixed
+# instructions come on top), overridable with PROMPT_TOKENS_<ENDPOINT>
+_DEFAULT_BUDGETS = {
+    "resume_analysis": 2000,
+    "job_matching": 2000,
+    "course_recommendation": 1500,
+    "cover_letter": 1750
+}
+PROMPT_TOKEN_BUDGETS = {
+    endpoint: int(os.getenv(f"PROMPT_TOKENS_{endpoint.upper()}", budget))
+    for endpoint, budget in _DEFAULT_BUDGETS.items()
+}
+# Largest share of a budget a job description may take; the resume gets the rest
+JD_BUDGET_SHARE = float(os.getenv("PROMPT_JD_BUDGET_SHARE", 0.35))
+# Job descriptions are user-supplied and unbounded; only this many characters are compacted
+JD_MAX_CHARS = int(os.getenv("PROMPT_JD_MAX_CHARS", 20000))
+
+# Average characters per token of English prose for Gemini-style tokenizers
+_CHARS_PER_TOKEN = 4
+
+# Sections kept first when there is no job description to rank against
+_SECTION_PRIORITY = ["header", "summary", "skills", "experience", "projects", "certifications", "education", "achievements", "other"]
+
+# Lines that cost tokens without telling the model anything about the candidate
+_BOILERPLATE = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r"^(curriculum vitae|resume|r[ée]sum[ée]|cv)$",
+    r"^page \d+( of \d+)?$",
+    r"^\d+$",
+    r"references?( are)? (available )?(up)?on request",
+    r"^i hereby declare",
+    r"^declaration$",
+    r"^(address|permanent address|current address)\s*[:\-]",
+    r"^(date of birth|dob|marital status|nationality|gender|father'?s name|languages known)\s*[:\-]",
+    r"\b\d{1,5}(\s+\w+){1,6}\s+(street|st|road|rd|avenue|ave|lane|ln|nagar|sector|block)\b[^\n]{0,80}\b\d{5,6}\b"
+]]
+# Contact, address and page lines are short; longer lines are never matched against _BOILERPLATE
+_BOILERPLATE_MAX_LINE = 200
+_REFERENCES_HEADING = re.compile(r"^\W*references\W*$", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def estimate_tokens(text):
+    """Rough token count of text, computed locally."""
+    return math.ceil(len(text) / _CHARS_PER_TOKEN) if text else 0
+
+
+class CompactedText:
+    """A prompt input after compaction, with its token estimates before and after."""
+
+    def __init__(self, text, original_tokens, measure=estimate_tokens):
+        self.text = text
+        self.original_tokens = original_tokens
+        self.tokens = measure(text)
+
+    @property
+    def saved_tokens(self):
+        return self.original_tokens - self.tokens
+
+
+def remove_boilerplate(text):
+    """
+    Drop repeated lines, page furniture, personal details, declarations and the
+    references section; what is left keeps its original line order.
+    """
+    lines = []
+    seen = set()
+    in_references = False
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            in_references = False
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        short = len(stripped) <= _BOILERPLATE_MAX_LINE
+        if short and _REFERENCES_HEADING.match(stripped):
+            in_references = True
+            continue
+        key = _WHITESPACE.sub(" ", stripped.lower())
+        if in_references or key in seen or (short and any(pattern.search(stripped) for pattern in _BOILERPLATE)):
+            continue
+        seen.add(key)
+        lines.append(stripped)
+    return "\n".join(lines).strip()
+
+
+def _segments(text):
+    """Split text into (section, text) pieces covering all of it, in order."""
+    spans = sorted(find_sections(text).items(), key=lambda item: item[1][0])
+    segments = []
+    position = 0
+    for section, (start, end) in spans:
+        if start > position:
+            segments.append(("header" if not segments else "other", text[position:start]))
+        segments.append((section, text[start:end]))
+        position = end
+    if position < len(text):
+        segments.append(("header" if not segments else "other", text[position:]))
+    return [(section, segment.strip()) for section, segment in segments if segment.strip()]
+
+
+def _relevance(segment, reference_terms):
+    """Distinct reference terms in the segment, damped by the segment's length."""
+    lemmas = normalize(segment)
+    if not lemmas:
+        return 0.0
+    return len(reference_terms.intersection(lemmas)) / math.sqrt(len(lemmas))
+
+
+def _truncate_lines(text, budget, measure=estimate_tokens):
+    """
+    Leading lines of text that fit in budget tokens; when not even the first line fits,
+    that line cut at the last word boundary inside the budget.
+    """
+    kept = []
+    used = 0
+    for line in text.split("\n"):
+        cost = measure(line) + 1
+        if used + cost > budget:
+            if not kept:
+                limit = max(0, budget - 1) * _CHARS_PER_TOKEN
+                cut = line.rfind(" ", 0, limit + 1)
+                return line[:cut if cut > 0 else limit].rstrip()
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+def compact_text(text, budget, reference=None, measure=estimate_tokens):
+    """
+    Fit text into about budget tokens: remove boilerplate, then, if it is still too
+    long, keep whole sections in order of relevance to reference (a job description,
+    as text or AnalyzedDocument) or by a fixed priority without one. Kept sections stay
+    in their original order; the section that overflows the budget is cut at a line.
+    measure(text) gives the tokens a piece of text costs in the prompt.
+    """
+    text = text.text if isinstance(text, AnalyzedDocument) else (text or "")
+    original_tokens = measure(text)
+    cleaned = remove_boilerplate(text)
+    if measure(cleaned) <= budget:
+        return CompactedText(cleaned, original_tokens, measure)
+
+    segments = _segments(cleaned)
+    if reference is not None:
+        reference_terms = set(analyze_text(reference).lemmas)
+        ranked = sorted(
+            range(len(segments)),
+            key=lambda i: (segments[i][0] != "header", -_relevance(segments[i][1], reference_terms))
+        )
+    else:
+        ranked = sorted(range(len(segments)), key=lambda i: _SECTION_PRIORITY.index(segments[i][0]))
+
+    kept = {}
+    remaining = budget
+    for i in ranked:
+        cost = measure(segments[i][1]) + 1
+        if cost <= remaining:
+            kept[i] = segments[i][1]
+            remaining -= cost
+        elif remaining > 50:
+            kept[i] = _truncate_lines(segments[i][1], remaining, measure)
+            remaining -= measure(kept[i]) + 1
+    return CompactedText("\n\n".join(kept[i] for i in sorted(kept) if kept[i]), original_tokens, measure)
+
+
+class NormalizedLines:
+    """
+    The normalized text of an AnalyzedDocument line by line, taken from the lemmas it
+    already has: tokens never span lines, so each line's share of the lemmas is the
+    next run of its non-stopword tokens. Lines it does not know (such as a line cut
+    during compaction) are normalized on demand.
+    """
+
+    def __init__(self, document):
+        document = analyze_text(document)
+        stop_words = get_stop_words()
+        lemmas = document.lemmas
+        position = 0
+        self._lines = {}
+        for line in document.text.splitlines():
+            count = sum(1 for token in tokenize(line) if token not in stop_words)
+            self._lines.setdefault(line.strip(), " ".join(lemmas[position:position + count]))
+            position += count
+        if position != len(lemmas):
+            self._lines = {}  # Lemmas from a different text: normalize every line instead
+
+    def text(self, text):
+        """Normalized text of text, whose lines come from the document."""
+        parts = []
+        for line in text.splitlines():
+            key = line.strip()
+            processed = self._lines.get(key)
+            if processed is None:
+                processed = self._lines[key] = " ".join(normalize(key))
+            if processed:
+                parts.append(processed)
+        return " ".join(parts)
+
+    def tokens(self, text):
+        return estimate_tokens(self.text(text))
+
+
+class _CompactionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, compacted):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {"requests": 0, "original_tokens": 0, "tokens": 0})
+            stats["requests"] += 1
+            stats["original_tokens"] += sum(item.original_tokens for item in compacted)
+            stats["tokens"] += sum(item.tokens for item in compacted)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: dict(stats, saved_tokens=stats["original_tokens"] - stats["tokens"])
+                for endpoint, stats in self._endpoints.items()
+            }
+
+
+_stats = _CompactionStats()
+
+
+def compact_prompt_inputs(endpoint, resume_text, job_description=None, normalized=False):
+    """
+    Compact the resume (and job description, if the prompt has one) for an endpoint's
+    token budget. The job description is capped at JD_BUDGET_SHARE of the budget and
+    the resume, ranked against it, gets the rest; only its first JD_MAX_CHARS characters
+    are considered. Returns (resume_text, job_description).
+    With normalized, the budget is measured on, and the result is, the normalized text
+    the prompt embeds, reusing the lemmas of inputs that are AnalyzedDocuments.
+    """
+    budget = PROMPT_TOKEN_BUDGETS[endpoint]
+    compacted = []
+    texts = []
+    if job_description is not None:
+        if isinstance(job_description, str):
+            job_description = job_description[:JD_MAX_CHARS]
+        jd_lines = NormalizedLines(job_description) if normalized else None
+        jd_text = job_description.text if isinstance(job_description, AnalyzedDocument) else job_description
+        jd = compact_text(jd_text[:JD_MAX_CHARS], int(budget * JD_BUDGET_SHARE),
+                          measure=jd_lines.tokens if normalized else estimate_tokens)
+        compacted.append(jd)
+        texts.append(jd_lines.text(jd.text) if normalized else jd.text)
+        budget -= jd.tokens
+    resume_lines = NormalizedLines(resume_text) if normalized else None
+    resume = compact_text(resume_text, budget, reference=job_description,
+                          measure=resume_lines.tokens if normalized else estimate_tokens)
+    compacted.insert(0, resume)
+    texts.insert(0, resume_lines.text(resume.text) if normalized else resume.text)
+
+    _stats.record(endpoint, compacted)
+    logger.info(
+        f"Prompt inputs for {endpoint}: {sum(item.original_tokens for item in compacted)} -> "
+        f"{sum(item.tokens for item in compacted)} tokens "
+        f"({sum(item.saved_tokens for item in compacted)} saved)"
+    )
+    return texts[0], (texts[1] if job_description is not None else None)
+
+
+def get_prompt_compaction_stats():
+    return _stats.snapshot()
@@ -0,0 +1,214 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from io import BytesIO
+from datetime import datetime
+from collections import OrderedDict
+from config.db import get_db
+from utils.file_parser import ExtractionUnavailableError, iter_resume_chunks
+from utils.keyword_extractor import AnalyzedDocument, analyze_chunks, extract_keywords
+from services.prompt_compaction_service import PROMPT_TOKEN_BUDGETS
+
+logger = logging.getLogger(__name__)
+
+# In-memory tier bound, in (estimated) bytes of cached artifacts
+RESUME_CACHE_MAX_BYTES = int(os.getenv("RESUME_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# Set to enable the shared Mongo tier behind the in-memory one
+RESUME_CACHE_MONGO = os.getenv("RESUME_CACHE_MONGO", "").lower() in ("1", "true", "yes")
+
+# Characters of a resume extracted before the rest is skipped: four times the largest
+# prompt budget (at ~4 characters per token), leaving room for boilerplate removal and
+# section ranking
+RESUME_MAX_CHARS = int(os.getenv("RESUME_MAX_CHARS", 4 * 4 * max(PROMPT_TOKEN_BUDGETS.values())))
+
+# Rough per-object overhead of a Python str inside a list
+_STR_OVERHEAD = 57
+
+
+def file_hash(file_bytes):
+    """Cache key of an upload: SHA-256 of the raw file bytes."""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+class ResumeArtifacts:
+    """
+    Resume-side analysis results that do not depend on the job description; the handle
+    every per-job step of a request shares.
+    """
+
+    def __init__(self, resume_text, document, keywords, file_hash=None):
+        self.file_hash = file_hash  # Content address of the upload the text came from
+        self.resume_text = resume_text
+        self.document = document  # AnalyzedDocument; also carries the ATS resume vectors
+        self.keywords = keywords
+
+    def size(self):
+        """Estimated memory footprint in bytes, used for eviction."""
+        size = 2 * len(self.resume_text)  # Raw and processed text
+        size += sum(len(word) + _STR_OVERHEAD for word in self.document.tokens)
+        size += sum(len(word) + _STR_OVERHEAD for word in self.document.lemmas)
+        size += sum(vector.nnz * 12 for vector in self.document.vectors.values())
+        return size
+
+
+class ResumeCache:
+    """
+    LRU cache of ResumeArtifacts keyed by file hash, evicting by total bytes rather than
+    entry count, with an optional Mongo tier shared by all workers.
+    """
+
+    def __init__(self, max_bytes=RESUME_CACHE_MAX_BYTES, use_mongo=RESUME_CACHE_MONGO):
+        self.max_bytes = max_bytes
+        self.use_mongo = use_mongo
+        self._entries = OrderedDict()  # key -> (artifacts, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.mongo_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        artifacts = self._mongo_get(key) if self.use_mongo else None
+        with self._lock:
+            if artifacts is None:
+                self.misses += 1
+                return None
+            self.mongo_hits += 1
+        self._store(key, artifacts)
+        return artifacts
+
+    def put(self, key, artifacts):
+        self._store(key, artifacts)
+        if self.use_mongo:
+            self._mongo_put(key, artifacts)
+
+    def _store(self, key, artifacts):
+        size = artifacts.size()
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (artifacts, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def _mongo_get(self, key):
+        try:
+            doc = get_db().resume_cache.find_one({"_id": key})
+        except Exception as e:
+            logger.error(f"Resume cache lookup failed: {str(e)}")
+            return None
+        if not doc:
+            return None
+        document = AnalyzedDocument(doc["resume_text"], tokens=doc["tokens"], lemmas=doc["lemmas"])
+        return ResumeArtifacts(doc["resume_text"], document, doc["keywords"], file_hash=key)
+
+    def _mongo_put(self, key, artifacts):
+        try:
+            get_db().resume_cache.update_one(
+                {"_id": key},
+                {"$set": {
+                    "resume_text": artifacts.resume_text,
+                    "tokens": artifacts.document.tokens,
+                    "lemmas": artifacts.document.lemmas,
+                    "keywords": artifacts.keywords,
+                    "created_at": datetime.now()
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Resume cache write failed: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.mongo_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "mongo_hits": self.mongo_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.mongo_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+resume_cache = ResumeCache()
+
+
+def get_resume_artifacts(file_bytes, parse):
+    """
+    Return the resume-side artifacts for an upload, computing them only when this file
+    has not been seen before. parse(file_bytes) yields the text in chunks, which are
+    analyzed as they arrive. Returns None if parsing fails or finds no text; raises
+    ExtractionUnavailableError when extraction could not run at all.
+    """
+    key = file_hash(file_bytes)
+    artifacts = resume_cache.get(key)
+    if artifacts is not None:
+        return artifacts
+
+    start_time = time.time()
+    try:
+        document = analyze_chunks(parse(file_bytes))
+    except ExtractionUnavailableError:
+        raise  # Not the file's fault; the caller may retry
+    except Exception as e:
+        logger.error(f"Error extracting text from file: {str(e)}")
+        return None
+    if document is None:
+        logger.error("Failed to extract text from resume. Ensure the document is not empty or scanned.")
+        return None
+    logger.info(f"Parsed and analyzed resume in {time.time() - start_time:.2f} seconds")
+    artifacts = ResumeArtifacts(document.text, document, extract_keywords(document, mode="ngram"), file_hash=key)
+    resume_cache.put(key, artifacts)
+    return artifacts
+
+
+class UploadedBytes(BytesIO):
+    """Stored bytes of an upload, readable like the original file."""
+
+    def __init__(self, data, filename):
+        super().__init__(data)
+        self.filename = filename
+
+
+def _read_upload(file):
+    """Read the whole upload, from the start even if the stream was read before."""
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return file.read()
+
+
+def _parse_upload(filename):
+    def parse(file_bytes):
+        return iter_resume_chunks(file_bytes, filename, max_chars=RESUME_MAX_CHARS)
+    return parse
+
+
+def load_resume_artifacts(file):
+    """
+    The artifacts of an uploaded resume file (a Flask upload or any stream with a
+    filename), parsing it only if these bytes have not been seen before.
+    """
+    return get_resume_artifacts(_read_upload(file), _parse_upload(file.filename))
+
+
+def get_resume_cache_stats():
+    return resume_cache.stats()
@@ -1,15 +1,32 @@
 from flask import Blueprint, request, jsonify
 from models.resume_model import Resume
 from services.ats_score_service import calculate_ats_score
-from services.gemini_service import analyze_resume_with_gemini
-from utils.file_parser import parse_resume_file
-from utils.keyword_extractor import extract_keywords
+from services.gemini_service import analyze_resume_with_gemini, calculate_fallback_score
+from services.resume_cache_service import load_resume_artifacts
+from utils.keyword_extractor import extract_keywords, AnalyzedDocument
+from services.skill_taxonomy_service import match_skills
+import os
+import time
 import logging
 import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
 resume_routes = Blueprint("resume_routes", __name__)
 logger = logging.getLogger(__name__)
 
+# Seconds an analysis may take end to end before it answers without the LLM result
+ANALYSIS_DEADLINE = float(os.getenv("ANALYSIS_DEADLINE", 20))
+# Runs the LLM call of each analysis alongside the request thread
+_stage_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("ANALYSIS_STAGE_WORKERS", 16)),
+    thread_name_prefix="analysis"
+)
+
+
+class UnparseableResumeError(ValueError):
+    """The uploaded file holds no text that could be extracted."""
+
+
 @resume_routes.route("/analyze", methods=["POST"])
 def analyze_resume_endpoint():
     try:
@@ -49,58 +66,96 @@ def analyze_resume_endpoint():
 
 
 def analyze_resume(user_id, file, job_description):
+    """Analyze a resume against a job description; returns {"error": ...} on failure."""
     try:
-        logger.info(f"Starting resume analysis for user {user_id}")
-
-        # Parse the resume file
-        resume_text = parse_resume_file(file)
-        if not resume_text:
-            raise ValueError("Failed to parse resume file")
-        
-        # Analyze with Gemini
-        analysis_result = analyze_resume_with_gemini(resume_text, job_description)
-        if not analysis_result or "error" in analysis_result:
-            raise ValueError(analysis_result.get("error", "Gemini analysis failed"))
-
-        # Calculate ATS score
-        ats_score = calculate_ats_score(resume_text, job_description)
-        if ats_score is None:
-            raise ValueError("Failed to calculate ATS score")
-
-        # Extract keywords
-        resume_keywords = extract_keywords(resume_text) or []
-        job_keywords = extract_keywords(job_description) or []
-        
-        # Format response with all required fields
-        response = {
-            "success": True,
-            "ats_score": ats_score,
-            "keywords": list(set(resume_keywords) & set(job_keywords)),
-            "suggestions": analysis_result.get("suggestions", []),
-            "missing_keywords": list(set(job_keywords) - set(resume_keywords)),
-            "score_breakdown": {
-                "keywords": analysis_result.get("match_score", 0),
-                "experience": analysis_result.get("experience_score", 20),
-                "education": analysis_result.get("education_score", 75),
-                "formatting": analysis_result.get("formatting_score", 90)
-            }
-        }
-
-        # Save to database
-        resume = Resume(
-            user_id=user_id,
-            resume_text=resume_text,
-            ats_score=ats_score,
-            keywords=response["keywords"],
-            suggestions=response["suggestions"]
-        )
-        resume.save()
-
-        return response
-
+        return run_resume_analysis(user_id, file, job_description)
     except ValueError as ve:
         logger.error(f"Validation error: {str(ve)}")
         return {"error": str(ve)}
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}", exc_info=True)
         return {"error": "Failed to process resume"}
+
+
+def run_resume_analysis(user_id, file, job_description):
+    """
+    Analyze a resume against a job description. Once the texts are analyzed, the Gemini
+    call (network wait) runs on the stage pool while ATS scoring, keywords and skills
+    are computed here; if Gemini misses the request deadline the local results are
+    returned with llm_status "timeout" and a fallback keyword score. Raises
+    UnparseableResumeError for a file with no extractable text, and other exceptions
+    (such as ExtractionUnavailableError under load) for failures worth retrying.
+    """
+    deadline = time.monotonic() + ANALYSIS_DEADLINE
+    logger.info(f"Starting resume analysis for user {user_id}")
+
+    # Parse and analyze the resume, or reuse the results for a file seen before
+    artifacts = load_resume_artifacts(file)
+    if not artifacts:
+        raise UnparseableResumeError("Failed to parse resume file")
+
+    # Analyze each text once and share the result with every stage below
+    resume_text = artifacts.resume_text
+    resume_doc = artifacts.document
+    jd_doc = AnalyzedDocument(job_description)
+
+    # Issue the Gemini call first, then score locally while it is in flight
+    llm_future = _stage_executor.submit(analyze_resume_with_gemini, resume_doc, jd_doc)
+
+    # Extract keywords
+    resume_keywords = artifacts.keywords or []
+    job_keywords = extract_keywords(jd_doc, mode="ngram") or []
+
+    # Matched/missing skills come from the local skill dictionary, not the LLM
+    skill_match = match_skills(resume_doc, jd_doc)
+
+    # Calculate ATS score here: on the stage pool it could queue behind slow LLM calls
+    ats_score = calculate_ats_score(resume_doc, jd_doc)
+    if ats_score is None:
+        raise ValueError("Failed to calculate ATS score")
+
+    # Analyze with Gemini, within what is left of the deadline
+    try:
+        analysis_result = llm_future.result(timeout=max(0, deadline - time.monotonic()))
+        # The Gemini stage answers with its keyword fallback when the call itself failed
+        llm_status = "fallback" if analysis_result and analysis_result.get("fallback") else "ok"
+    except FutureTimeoutError:
+        llm_future.cancel()  # Frees the stage pool if the call has not started yet
+        logger.warning(f"Gemini analysis missed the {ANALYSIS_DEADLINE:.0f}s deadline for user {user_id}")
+        analysis_result = {
+            "suggestions": [],
+            "match_score": calculate_fallback_score(resume_doc, jd_doc)
+        }
+        llm_status = "timeout"
+    if not analysis_result or "error" in analysis_result:
+        raise ValueError(analysis_result.get("error", "Gemini analysis failed"))
+    
+    # Format response with all required fields
+    response = {
+        "success": True,
+        "llm_status": llm_status,
+        "ats_score": ats_score,
+        "keywords": list(set(resume_keywords) & set(job_keywords)),
+        "suggestions": analysis_result.get("suggestions", []),
+        "missing_keywords": list(set(job_keywords) - set(resume_keywords)),
+        "matched_skills": skill_match["matched_skills"],
+        "missing_skills": skill_match["missing_skills"],
+        "score_breakdown": {
+            "keywords": analysis_result.get("match_score", 0),
+            "experience": analysis_result.get("experience_score", 20),
+            "education": analysis_result.get("education_score", 75),
+            "formatting": analysis_result.get("formatting_score", 90)
+        }
+    }
+
+    # Save to database
+    resume = Resume(
+        user_id=user_id,
+        resume_text=resume_text,
+        ats_score=ats_score,
+        keywords=response["keywords"],
+        suggestions=response["suggestions"]
+    )
+    resume.save()
+
+    return response
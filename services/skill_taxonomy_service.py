@@ -0,0 +1,91 @@
+import threading
+from utils.keyword_extractor import AnalyzedDocument
+from utils.skill_matcher import load_skills, find_skills
+
+
+class SkillTaxonomy:
+    """
+    Canonical skills with their aliases and parent category. Every skill gets an integer
+    ID, and a set of skills is held as a bitset (a Python int with bit ID set), so
+    matched/missing skills are a couple of bitwise operations.
+    """
+
+    def __init__(self, entries):
+        self.skills = []        # skill ID -> canonical name
+        self.categories = []    # skill ID -> parent category
+        self.index = {}         # canonical name or alias -> skill ID
+        self.category_masks = {}  # category -> bitset of its skills
+
+        for canonical, aliases, category in entries:
+            if canonical in self.index:
+                continue
+            skill_id = len(self.skills)
+            self.skills.append(canonical)
+            self.categories.append(category)
+            for name in [canonical] + aliases:
+                self.index.setdefault(name, skill_id)
+            self.category_masks[category] = self.category_masks.get(category, 0) | (1 << skill_id)
+
+    def to_mask(self, names):
+        """Bitset of the known skills among names (canonical names or aliases)."""
+        mask = 0
+        for name in names:
+            skill_id = self.index.get(name.lower())
+            if skill_id is not None:
+                mask |= 1 << skill_id
+        return mask
+
+    def from_mask(self, mask):
+        """Canonical names of the skills in a bitset, in taxonomy order."""
+        names = []
+        while mask:
+            lowest = mask & -mask
+            names.append(self.skills[lowest.bit_length() - 1])
+            mask ^= lowest
+        return names
+
+    def category_of(self, name):
+        skill_id = self.index.get(name.lower())
+        return self.categories[skill_id] if skill_id is not None else None
+
+
+_taxonomy = None
+_lock = threading.Lock()
+
+
+def get_skill_taxonomy():
+    """The taxonomy loaded from the skill dictionary on first use."""
+    global _taxonomy
+    if _taxonomy is None:
+        with _lock:
+            if _taxonomy is None:
+                _taxonomy = SkillTaxonomy(load_skills())
+    return _taxonomy
+
+
+def skill_mask(text):
+    """Reduce a text or AnalyzedDocument to the bitset of skills it mentions."""
+    skills = text.skills if isinstance(text, AnalyzedDocument) else find_skills(text or "")
+    return get_skill_taxonomy().to_mask(skills)
+
+
+def diff_skill_masks(resume_mask, jd_mask):
+    taxonomy = get_skill_taxonomy()
+    return {
+        "matched_skills": taxonomy.from_mask(resume_mask & jd_mask),
+        "missing_skills": taxonomy.from_mask(jd_mask & ~resume_mask)
+    }
+
+
+def match_skills(resume_text, job_description):
+    """Matched and missing skills of one resume against one job description."""
+    return diff_skill_masks(skill_mask(resume_text), skill_mask(job_description))
+
+
+def match_skills_bulk(resume_text, job_descriptions):
+    """
+    Matched and missing skills of one resume against many job descriptions. The resume
+    is reduced to a skill bitset once; each JD then costs one scan and two bit operations.
+    """
+    resume_mask = skill_mask(resume_text)
+    return [diff_skill_masks(resume_mask, skill_mask(jd)) for jd in job_descriptions]
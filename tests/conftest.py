@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture
+def nltk_data():
+    """Skip a test that needs the bundled NLTK stopwords and WordNet when they are absent."""
+    from utils.nltk_resources import preload_nltk_resources
+    try:
+        preload_nltk_resources()
+    except (ImportError, LookupError) as e:
+        pytest.skip(f"NLTK data unavailable: {e}")
@@ -0,0 +1,33 @@
+import time
+
+import pytest
+
+for module in ("flask", "flask_pymongo", "dotenv", "sklearn"):
+    pytest.importorskip(module)
+
+import services.analysis_job_service as analysis_job_service
+import services.resume_cache_service as resume_cache_service
+from services.analysis_job_service import AnalysisJobQueue, MemoryJobStore, FAILED
+from utils.file_parser import ExtractionTimeoutError
+
+
+def test_extraction_that_always_times_out_is_tried_at_most_twice(monkeypatch):
+    attempts = []
+
+    def timing_out_extractor(file_bytes, filename, max_chars=None):
+        attempts.append(filename)
+        raise ExtractionTimeoutError(f"Extraction of {filename} timed out after 15s")
+        yield  # A generator, like the real extractor
+
+    monkeypatch.setattr(resume_cache_service, "iter_resume_chunks", timing_out_extractor)
+    monkeypatch.setattr(analysis_job_service, "ANALYSIS_JOB_RETRY_DELAY", 0)
+    queue = AnalysisJobQueue(MemoryJobStore(), workers=0, max_attempts=3)
+    job_id = queue.submit("user-1", b"%PDF-1.4 crafted", "crafted.pdf", "Python developer")
+
+    while (job := queue.store.claim(time.time(), queue.visibility_timeout)) is not None:
+        queue._run(job)
+
+    status = queue.get(job_id, "user-1")
+    assert status["status"] == FAILED
+    assert status["attempts"] == 2
+    assert len(attempts) == 2
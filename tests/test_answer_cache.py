@@ -0,0 +1,33 @@
+import pytest
+
+from services.answer_cache_service import AnswerCache
+
+
+@pytest.fixture
+def cache(tmp_path, nltk_data):
+    # A loose threshold, so the near misses below are close enough by vector alone
+    return AnswerCache(path=str(tmp_path / "answers.json"), size=16, threshold=0.6)
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Should I learn Java for backend development to get my first software engineering job?",
+     "Should I learn Python for backend development to get my first software engineering job?"),
+    ("Which skills should I put on my resume when applying for frontend developer roles?",
+     "Which skills should I put on my resume when applying for backend developer roles?"),
+    ("How should I describe an internship that lasted 6 months on my resume?",
+     "How should I describe an internship that lasted 2 years on my resume?"),
+    ("Should I include a photo on my resume?",
+     "Should I not include a photo on my resume?"),
+])
+def test_near_miss_questions_do_not_share_an_answer(cache, cached, asked):
+    cache.add(cached, "cached answer")
+    assert cache.lookup(asked) is None
+
+
+def test_rephrased_question_reuses_the_answer(cache):
+    cache.add("Should I learn Java for backend development to get my first software engineering job?",
+              "cached answer")
+    assert cache.lookup("should i learn java for backend development to get my first software engineering job") \
+        == "cached answer"
+    assert cache.lookup("Should I learn Java for the backend development, to get my first software engineering job") \
+        == "cached answer"
@@ -0,0 +1,27 @@
+import subprocess
+import sys
+import textwrap
+
+ROOT = __file__.rsplit("/tests/", 1)[0]
+
+
+def test_extraction_worker_does_not_import_the_main_script(tmp_path):
+    # Stands in for `python app.py`: its module-level setup must run once, in the parent
+    marker = tmp_path / "imports.txt"
+    script = tmp_path / "app.py"
+    script.write_text(textwrap.dedent(f"""
+        import sys
+        sys.path.insert(0, {ROOT!r})
+        with open({str(marker)!r}, "a") as f:
+            f.write(__name__ + "\\n")
+
+        from utils.file_parser import ExtractionPool
+
+        if __name__ == "__main__":
+            pool = ExtractionPool(workers=1, start_method="spawn")
+            print(pool.extract(b"Python developer", "resume.txt"))
+    """))
+    result = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "Python developer"
+    assert marker.read_text().split() == ["__main__"]
@@ -0,0 +1,17 @@
+from utils import keyword_extractor
+from utils.keyword_extractor import AnalyzedDocument, extract_keywords, iter_ngrams
+
+RESUME = """Senior Python developer with experience in machine learning pipelines.
+Built data pipelines and REST APIs; mentored engineers on machine learning."""
+
+
+def test_ngrams_reuse_the_document_lemmas(nltk_data, monkeypatch):
+    document = AnalyzedDocument(RESUME)
+    expected = list(iter_ngrams(document.tokens))
+
+    def no_lemmatize(token):
+        raise AssertionError(f"lemmatized {token!r} again")
+
+    monkeypatch.setattr(keyword_extractor, "lemmatize", no_lemmatize)
+    assert list(iter_ngrams(document.tokens, lemmas=document.lemmas)) == expected
+    assert extract_keywords(document, mode="ngram")
@@ -0,0 +1,16 @@
+from utils.lemma_cache import LemmaCache
+
+
+def test_table_hits_are_cached(tmp_path, monkeypatch):
+    table = tmp_path / "lemma_table.tsv"
+    table.write_bytes(b"engineers\tengineer\npython\t\n")
+    cache = LemmaCache(table_path=str(table), maxsize=10)
+    lookups = []
+    table_get = cache.table.get
+    monkeypatch.setattr(cache.table, "get", lambda word: lookups.append(word) or table_get(word))
+
+    assert [cache.lemmatize("engineers") for _ in range(3)] == ["engineer"] * 3
+    assert cache.lemmatize("python") == "python"
+    assert lookups == ["engineers", "python"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["table_hits"], stats["misses"], stats["cache_size"]) == (2, 2, 0, 2)
@@ -0,0 +1,21 @@
+import time
+
+from services.prompt_compaction_service import remove_boilerplate
+
+
+def test_remove_boilerplate_is_fast_on_a_long_single_line():
+    # Digit-heavy and prose single lines of ~50KB used to backtrack for seconds
+    lines = [
+        " ".join(f"{i % 100000} main street" for i in range(3500))[:50000],
+        ("We are hiring a backend engineer with 5 years of Python experience at 12 Park "
+         "Avenue to build data pipelines. " * 500)[:50000],
+    ]
+    for line in lines:
+        start_time = time.perf_counter()
+        assert remove_boilerplate(line) == line
+        assert time.perf_counter() - start_time < 0.5
+
+
+def test_remove_boilerplate_still_drops_addresses():
+    text = "Jane Doe\n221 Baker Street, London 560001\nPython developer"
+    assert remove_boilerplate(text) == "Jane Doe\nPython developer"
@@ -1,28 +1,312 @@
-import PyPDF2
-from docx import Document
+import os
+import sys
 import time
+import types
+import queue
+import logging
+import threading
+import multiprocessing
+from io import BytesIO
+from collections import deque
 
-def parse_resume_file(file):
-    """Extract text from a file (PDF or DOCX) with improved error handling."""
+logger = logging.getLogger(__name__)
+
+# Extraction runs in this many worker processes (0: in the calling thread)
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", 2))
+# Documents a worker extracts before it is replaced, to cap memory growth
+EXTRACT_MAX_TASKS_PER_WORKER = int(os.getenv("EXTRACT_MAX_TASKS_PER_WORKER", 100))
+# Seconds one document may take before its worker is killed, and may wait for a worker
+EXTRACT_TIMEOUT = float(os.getenv("EXTRACT_TIMEOUT", 15))
+EXTRACT_QUEUE_TIMEOUT = float(os.getenv("EXTRACT_QUEUE_TIMEOUT", 10))
+# Uploads over this many bytes are refused; only the first pages of longer PDFs are read
+EXTRACT_MAX_BYTES = int(os.getenv("EXTRACT_MAX_BYTES", 10 * 1024 * 1024))
+EXTRACT_MAX_PAGES = int(os.getenv("EXTRACT_MAX_PAGES", 10))
+# Fresh interpreters for workers; forking a threaded server process is not safe
+EXTRACT_START_METHOD = os.getenv("EXTRACT_START_METHOD", "spawn")
+
+_SAMPLE_SIZE = 500
+# DOCX paragraphs per streamed chunk
+_DOCX_BATCH = 20
+
+
+class ExtractionError(RuntimeError):
+    """A document could not be extracted within the extraction policy."""
+
+
+class ExtractionUnavailableError(ExtractionError):
+    """Extraction could not finish for reasons other than the document (no free worker,
+    a crashed worker, a timeout); retrying later may succeed."""
+
+
+class ExtractionTimeoutError(ExtractionUnavailableError):
+    """The worker timed out or died on this document, which may be the document's doing
+    (a crafted PDF); worth at most one more try."""
+
+
+def _budgeted(chunks, max_chars):
+    """Pass chunks through until max_chars characters, cutting the last one at a space."""
+    remaining = max_chars
+    for chunk in chunks:
+        if remaining is not None and len(chunk) >= remaining:
+            cut = chunk.rfind(" ", 0, remaining)
+            yield chunk[:cut if cut > 0 else remaining]
+            return
+        yield chunk
+        if remaining is not None:
+            remaining -= len(chunk) + 1  # The newline chunks are joined with
+
+
+def iter_text_chunks(file_bytes, filename, max_pages=EXTRACT_MAX_PAGES, max_chars=None):
+    """
+    Yield the text of a PDF page by page, of a DOCX in batches of paragraphs, or of a
+    plain-text file, as each part is decoded. Joined with "\n", the chunks are the
+    document's text. Decoding stops after max_pages PDF pages or max_chars characters.
+    """
+    if filename.endswith('.pdf'):
+        import PyPDF2
+        pdf_reader = PyPDF2.PdfReader(BytesIO(file_bytes))
+        chunks = (page.extract_text() for page in pdf_reader.pages[:max_pages])
+    elif filename.endswith('.docx'):
+        from docx import Document
+        doc = Document(BytesIO(file_bytes))
+        chunks = _paragraph_batches(doc.paragraphs)
+    else:
+        chunks = iter([file_bytes.decode('utf-8', errors='ignore')])
+    yield from _budgeted((chunk for chunk in chunks if chunk), max_chars)
+
+
+def _paragraph_batches(paragraphs):
+    batch = []
+    for para in paragraphs:
+        if para.text.strip():
+            batch.append(para.text)
+            if len(batch) == _DOCX_BATCH:
+                yield '\n'.join(batch)
+                batch = []
+    if batch:
+        yield '\n'.join(batch)
+
+
+def extract_text(file_bytes, filename, max_pages=EXTRACT_MAX_PAGES, max_chars=None):
+    """Text of a PDF, DOCX or plain-text document, reading at most max_pages PDF pages."""
+    return "\n".join(iter_text_chunks(file_bytes, filename, max_pages, max_chars))
+
+
+def _worker_loop(conn):
+    """
+    Worker process: for each (bytes, filename, max_pages, max_chars) received, send
+    ("chunk", text) as each part is decoded, then ("done", None) or ("error", message).
+    """
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        try:
+            for chunk in iter_text_chunks(*task):
+                conn.send(("chunk", chunk))
+            conn.send(("done", None))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+_start_lock = threading.Lock()
+
+
+def _start_without_main(process):
+    """
+    Start a process without the child re-importing the parent's __main__: under
+    `python app.py` every spawned worker would otherwise rerun the whole app setup
+    (ATS model, blueprints, Mongo client). Spawn only records a main module for the
+    child to import when __main__ has a file or module name, so a bare one stands in
+    while the process starts; the worker needs nothing from it.
+    """
+    with _start_lock:  # Two overlapping swaps could leave the bare module in place
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            process.start()
+        finally:
+            sys.modules["__main__"] = main
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_loop, args=(child_conn,), daemon=True)
+        _start_without_main(self.process)
+        child_conn.close()
+        self.tasks = 0
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=1)
+        self.conn.close()
+
+
+class ExtractionPool:
+    """
+    Bounded pool of extraction processes. Each document goes to one idle worker; a
+    worker that overruns the timeout is killed and replaced, and every worker is
+    recycled after max_tasks documents. Workers start on first use.
+    """
+
+    def __init__(self, workers=EXTRACT_WORKERS, max_tasks=EXTRACT_MAX_TASKS_PER_WORKER,
+                 timeout=EXTRACT_TIMEOUT, start_method=EXTRACT_START_METHOD):
+        self.max_tasks = max_tasks
+        self.timeout = timeout
+        self._context = multiprocessing.get_context(start_method)
+        self._idle = queue.Queue()
+        for _ in range(workers):
+            self._idle.put(None)  # Started on first use
+        self._lock = threading.Lock()
+        self.size = workers
+        self.waiting = 0
+        self.busy = 0
+        self.documents = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.recycled = 0
+        self.durations = deque(maxlen=_SAMPLE_SIZE)
+
+    def iter_extract(self, file_bytes, filename, max_pages=EXTRACT_MAX_PAGES, max_chars=None):
+        """
+        Yield a document's text chunks from a worker process as they are decoded, so
+        callers can work on early pages while later ones are still being read. Raises
+        ExtractionError on any failure, including the whole document overrunning the
+        timeout. A worker whose stream is abandoned midway is killed and replaced.
+        """
+        with self._lock:
+            self.waiting += 1
+        try:
+            worker = self._idle.get(timeout=EXTRACT_QUEUE_TIMEOUT)
+        except queue.Empty:
+            with self._lock:
+                self.rejected += 1
+            raise ExtractionUnavailableError("All extraction workers are busy")
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        with self._lock:
+            self.busy += 1
+        start_time = time.monotonic()
+        deadline = start_time + self.timeout
+        finished = False
+        try:
+            if worker is None:
+                worker = _Worker(self._context)
+            worker.conn.send((file_bytes, filename, max_pages, max_chars))
+            while True:
+                if not worker.conn.poll(max(0, deadline - time.monotonic())):
+                    with self._lock:
+                        self.timeouts += 1
+                    raise ExtractionTimeoutError(f"Extraction of {filename} timed out after {self.timeout:.0f}s")
+                status, result = worker.conn.recv()
+                if status == "chunk":
+                    yield result
+                    continue
+                finished = True
+                worker.tasks += 1
+                if status == "error":
+                    with self._lock:
+                        self.errors += 1
+                    raise ExtractionError(result)
+                return
+        except (EOFError, OSError) as e:
+            # The worker died mid-document (e.g. out of memory)
+            with self._lock:
+                self.errors += 1
+            raise ExtractionTimeoutError(f"Extraction worker failed: {e}")
+        finally:
+            if worker is not None and not finished:
+                # Timed out, died, or the caller stopped reading: the worker's state is unknown
+                worker.kill()
+                worker = None
+            elif worker is not None and worker.tasks >= self.max_tasks:
+                worker.stop()
+                worker = None
+                with self._lock:
+                    self.recycled += 1
+            with self._lock:
+                self.busy -= 1
+                self.documents += 1
+                self.durations.append(time.monotonic() - start_time)
+            self._idle.put(worker)
+
+    def extract(self, file_bytes, filename, max_pages=EXTRACT_MAX_PAGES, max_chars=None):
+        """Extract a document in a worker process; raises ExtractionError on any failure."""
+        return "\n".join(self.iter_extract(file_bytes, filename, max_pages, max_chars))
+
+    def stats(self):
+        with self._lock:
+            durations = sorted(self.durations)
+
+            def percentile(p):
+                return round(durations[min(len(durations) - 1, int(p * len(durations)))], 3) if durations else None
+
+            return {
+                "workers": self.size,
+                "queue_depth": self.waiting,
+                "busy": self.busy,
+                "documents": self.documents,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "rejected": self.rejected,
+                "recycled": self.recycled,
+                "extraction_p50": percentile(0.5),
+                "extraction_p95": percentile(0.95)
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ExtractionPool()
+    return _pool
+
+
+def iter_resume_chunks(file_bytes, filename, max_chars=None):
+    """
+    Yield an uploaded document's text chunks as they are decoded, in the extraction
+    pool (or in this thread when EXTRACT_WORKERS is 0). Raises ExtractionError when the
+    upload is refused or extraction fails.
+    """
+    if len(file_bytes) > EXTRACT_MAX_BYTES:
+        raise ExtractionError(f"{filename} is larger than {EXTRACT_MAX_BYTES} bytes")
+    if EXTRACT_WORKERS > 0:
+        return get_extraction_pool().iter_extract(file_bytes, filename, max_chars=max_chars)
+    return iter_text_chunks(file_bytes, filename, max_chars=max_chars)
+
+
+def parse_resume_bytes(file_bytes, filename, max_chars=None):
+    """Extract text from an uploaded document's bytes; "" when it is refused or fails."""
     try:
         start_time = time.time()
-        text = ""
-
-        if file.filename.endswith('.pdf'):
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        elif file.filename.endswith('.docx'):
-            doc = Document(file)
-            text = '\n'.join([para.text for para in doc.paragraphs if para.text.strip()])
-        else:
-            text = file.read().decode('utf-8', errors='ignore')
+
+        text = "\n".join(iter_resume_chunks(file_bytes, filename, max_chars))
 
         end_time = time.time()
         print(f"Time taken to parse resume: {end_time - start_time:.2f} seconds")
-        
+
         if not text.strip():
             raise ValueError("Failed to extract text from resume. Ensure the document is not empty or scanned.")
 
@@ -31,3 +315,12 @@ def parse_resume_file(file):
     except Exception as e:
         print(f"Error extracting text from file: {e}")
         return ""
+
+
+def parse_resume_file(file, max_chars=None):
+    """Extract text from a file (PDF or DOCX) with improved error handling."""
+    return parse_resume_bytes(file.read(), file.filename, max_chars)
+
+
+def get_extraction_stats():
+    return get_extraction_pool().stats() if EXTRACT_WORKERS > 0 else {"workers": 0}
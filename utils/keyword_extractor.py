@@ -1,16 +1,15 @@
-import string
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from collections import Counter
-
-# Ensure necessary NLTK data is downloaded
-nltk.download("stopwords")
-nltk.download("wordnet")
-
-# Initialize NLP tools
-lemmatizer = WordNetLemmatizer()
-stop_words = set(stopwords.words("english"))
+import os
+import sys
+import json
+import math
+import heapq
+import hashlib
+import threading
+from collections import Counter, deque
+from utils.lemma_cache import lemmatize
+from utils.nltk_resources import get_stop_words
+from utils.text_pipeline import tokenize, lemmatize_tokens, normalize
+from utils.skill_matcher import find_sections, find_skills
 
 def preprocess_text(text):
     """
@@ -20,21 +19,171 @@ def preprocess_text(text):
     - Removing stopwords
     - Lemmatizing words
     """
-    if not text or len(text.strip()) == 0:
-        return ""  # Handle empty text gracefully
+    return " ".join(normalize(text))  # "" for empty text
+
+class AnalyzedDocument:
+    """
+    A text analyzed once per request and shared by every analysis stage
+    (Gemini prompt, ATS scoring, keyword extraction, fallback scoring).
+    """
+    def __init__(self, text, tokens=None, lemmas=None):
+        self.text = text or ""
+        self.content_hash = hashlib.sha256(self.text.encode("utf-8", errors="ignore")).hexdigest()
+
+        # Tokens and lemmas may be passed in when restoring a cached analysis of the same text
+        if tokens is not None:
+            self.tokens = tokens
+        else:
+            self.tokens = tokenize(self.text)
+        self.lemmas = lemmas if lemmas is not None else lemmatize_tokens(self.tokens)
+
+        self.processed_text = " ".join(self.lemmas)  # Same as preprocess_text(text)
+        self.term_counts = Counter(self.lemmas)
+        self.sections = find_sections(self.text)  # Section name -> (start, end) span
+        self.skills = find_skills(self.text)  # Dictionary skill -> occurrence count
+        self.vectors = {}  # ATS model version -> TF-IDF row, filled in by the ATS scorer
+
+def analyze_text(text):
+    """Return an AnalyzedDocument for text, reusing it if it is already analyzed."""
+    if isinstance(text, AnalyzedDocument):
+        return text
+    return AnalyzedDocument(text)
+
+def analyze_chunks(chunks):
+    """
+    AnalyzedDocument of text arriving in chunks (joined with "\n"), tokenizing and
+    lemmatizing each chunk as it comes so the work overlaps with producing the rest.
+    Returns None if the chunks hold no text.
+    """
+    parts, tokens, lemmas = [], [], []
+    for chunk in chunks:
+        parts.append(chunk)
+        chunk_tokens = tokenize(chunk)  # Tokens never span chunks: they split on whitespace
+        tokens.extend(chunk_tokens)
+        lemmas.extend(lemmatize_tokens(chunk_tokens))
+    text = "\n".join(parts).strip()
+    if not text:
+        return None
+    return AnalyzedDocument(text, tokens=tokens, lemmas=lemmas)
 
-    text = text.lower()
-    text = text.translate(str.maketrans("", "", string.punctuation))  # Remove punctuation
-    words = text.split()
-    processed_words = [lemmatizer.lemmatize(word) for word in words if word not in stop_words]
+# Document frequencies of unigrams/bigrams/trigrams over a background corpus of resumes and JDs
+BACKGROUND_DF_PATH = os.getenv("KEYWORD_BACKGROUND_PATH", os.path.join("data", "keyword_background.json"))
+MAX_NGRAM = 3
+# Phrases must be this common in the background corpus (or repeat in the text) to count
+MIN_PHRASE_DF = 2
 
-    return " ".join(processed_words)
+_background = None
+_background_lock = threading.Lock()
 
-def extract_keywords(text, top_n=10):
+def get_background_df():
+    """Return (document count, {ngram: df}) for the background corpus, loaded on first use."""
+    global _background
+    if _background is None:
+        with _background_lock:
+            if _background is None:
+                try:
+                    with open(BACKGROUND_DF_PATH, encoding="utf-8") as f:
+                        data = json.load(f)
+                    _background = (data["documents"], data["df"])
+                except FileNotFoundError:
+                    _background = (0, {})  # No background: every term is weighted equally
+    return _background
+
+def iter_ngrams(tokens, max_n=MAX_NGRAM, lemmas=None):
+    """
+    Stream the lemmatized 1..max_n-grams of a token sequence. Phrases never span a
+    stopword, so "experience in python" does not yield "experience python". lemmas,
+    the lemmas of the non-stopword tokens in order (an AnalyzedDocument's), are used
+    instead of lemmatizing again when given.
     """
-    Extracts the most common keywords from the text after preprocessing.
+    stop_words = get_stop_words()
+    if lemmas is not None and len(lemmas) != sum(1 for token in tokens if token not in stop_words):
+        lemmas = None  # Lemmas of a different token sequence: lemmatize here instead
+    lemmas = iter(lemmas) if lemmas is not None else None
+    window = deque(maxlen=max_n)
+    for token in tokens:
+        if token in stop_words:
+            window.clear()
+            continue
+        window.append(next(lemmas) if lemmas is not None else lemmatize(token))
+        words = list(window)
+        for n in range(1, len(words) + 1):
+            yield " ".join(words[-n:])
+
+def _ngram_keywords(document, top_n):
     """
-    processed_text = preprocess_text(text)
-    words = processed_text.split()
-    word_counts = Counter(words)
+    Top n-grams by TF-IDF against the background corpus, picked with a heap rather
+    than a full sort; words already covered by a chosen phrase are not repeated.
+    """
+    documents, background_df = get_background_df()
+    counts = Counter(iter_ngrams(document.tokens, lemmas=document.lemmas))
+
+    scores = {}
+    for ngram, tf in counts.items():
+        df = background_df.get(ngram, 0)
+        if " " in ngram and df < MIN_PHRASE_DF and tf < 2:
+            continue  # Not an established phrase, just adjacent words
+        idf = math.log((documents + 1) / (df + 1)) + 1
+        scores[ngram] = (1 + math.log(tf)) * idf * (1 + 0.5 * ngram.count(" "))
+
+    keywords = []
+    covered = set()
+    for ngram in heapq.nlargest(top_n * 3, scores, key=lambda term: (scores[term], term)):
+        words = ngram.split()
+        if all(word in covered for word in words):
+            continue
+        keywords.append(ngram)
+        covered.update(words)
+        if len(keywords) == top_n:
+            break
+    return keywords
+
+def extract_keywords(text, top_n=10, mode="frequency"):
+    """
+    Extracts keywords from the text (or AnalyzedDocument) after preprocessing.
+    mode="frequency" returns the most common words; mode="ngram" returns unigrams and
+    phrases weighted against the background corpus.
+    """
+    document = analyze_text(text)
+    if mode == "ngram":
+        return _ngram_keywords(document, top_n)
+    word_counts = document.term_counts
     return [word for word, _ in word_counts.most_common(top_n)]
+
+def count_background_df(texts):
+    """
+    (document count, Counter of the documents each n-gram appears in) over texts. Only
+    tokens are needed, so no AnalyzedDocument (lemmas, sections, skills) is built.
+    """
+    df = Counter()
+    documents = 0
+    for text in texts:
+        tokens = tokenize(text)
+        if tokens:
+            documents += 1
+            df.update(set(iter_ngrams(tokens)))
+    return documents, df
+
+def build_background_df(texts, path=BACKGROUND_DF_PATH):
+    """Count the documents each n-gram appears in and write the background table."""
+    documents, df = count_background_df(texts)
+
+    # Singletons carry no weight signal and dominate the table size
+    table = {"documents": documents, "df": {ngram: n for ngram, n in df.items() if n >= 2}}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(table, f)
+    os.replace(tmp_path, path)
+    return documents
+
+# Rebuild the background table from stored resumes plus any JD text files given:
+#   python -m utils.keyword_extractor [file.txt ...]
+if __name__ == "__main__":
+    from models.resume_model import Resume
+
+    texts = [doc.get("resume_text", "") for doc in Resume.find_all_texts()]
+    for name in sys.argv[1:]:
+        with open(name, encoding="utf-8", errors="ignore") as f:
+            texts.append(f.read())
+    print(f"Wrote background frequencies of {build_background_df(texts)} documents to {BACKGROUND_DF_PATH}")
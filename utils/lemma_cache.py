@@ -0,0 +1,155 @@
+import os
+import sys
+import string
+import mmap
+import threading
+from array import array
+from collections import OrderedDict, Counter
+from utils.nltk_resources import get_lemmatizer, get_stop_words
+
+# Precomputed lemmas of common resume/JD vocabulary, one "word\tlemma" line per word sorted
+# by word; the lemma is left empty when it equals the word
+LEMMA_TABLE_PATH = os.getenv("LEMMA_TABLE_PATH", os.path.join("data", "lemma_table.tsv"))
+LEMMA_CACHE_SIZE = int(os.getenv("LEMMA_CACHE_SIZE", 50000))
+LEMMA_TABLE_SIZE = 20000
+
+
+class LemmaTable:
+    """Read-only word -> lemma table memory-mapped from disk and searched by bisection."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        # Line start offsets; the mapped bytes stay shared between forked workers
+        self._offsets = array("Q")
+        position = 0
+        while position < len(self._map):
+            self._offsets.append(position)
+            position = self._map.find(b"\n", position)
+            if position < 0:
+                break
+            position += 1
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _line(self, index):
+        start = self._offsets[index]
+        end = self._map.find(b"\n", start)
+        return self._map[start:end if end >= 0 else len(self._map)]
+
+    def get(self, word):
+        key = word.encode("utf-8")
+        low, high = 0, len(self._offsets)
+        while low < high:
+            middle = (low + high) // 2
+            entry, _, lemma = self._line(middle).partition(b"\t")
+            if entry < key:
+                low = middle + 1
+            elif entry > key:
+                high = middle
+            else:
+                return lemma.decode("utf-8") if lemma else word
+        return None
+
+
+class LemmaCache:
+    """
+    Bounded LRU cache in front of a LemmaTable and WordNetLemmatizer; lemmas from
+    either are cached. The lemmatizer is only consulted for tokens not in the table.
+    """
+
+    def __init__(self, table_path=LEMMA_TABLE_PATH, maxsize=LEMMA_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.table_hits = 0
+        self.misses = 0
+        try:
+            self.table = LemmaTable(table_path)
+        except (FileNotFoundError, ValueError):
+            # Missing or empty table: every word goes through the lemmatizer once
+            self.table = None
+
+    def lemmatize(self, word):
+        with self._lock:
+            lemma = self._cache.get(word)
+            if lemma is not None:
+                self._cache.move_to_end(word)
+                self.hits += 1
+                return lemma
+
+        # Table hits are cached too, so the hottest words skip the bisection after their first use
+        lemma = self.table.get(word) if self.table is not None else None
+        from_table = lemma is not None
+        if not from_table:
+            lemma = get_lemmatizer().lemmatize(word)
+        with self._lock:
+            if from_table:
+                self.table_hits += 1
+            else:
+                self.misses += 1
+            self._cache[word] = lemma
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return lemma
+
+    def stats(self):
+        with self._lock:
+            hits, table_hits, misses, cache_size = self.hits, self.table_hits, self.misses, len(self._cache)
+        lookups = hits + table_hits + misses
+        return {
+            "hits": hits,
+            "table_hits": table_hits,
+            "misses": misses,
+            "hit_rate": round((hits + table_hits) / lookups, 4) if lookups else 0.0,
+            "cache_size": cache_size,
+            "table_size": len(self.table) if self.table is not None else 0
+        }
+
+
+lemma_cache = LemmaCache()
+
+
+def lemmatize(word):
+    return lemma_cache.lemmatize(word)
+
+
+def get_lemma_cache_stats():
+    return lemma_cache.stats()
+
+
+def build_lemma_table(texts, path=LEMMA_TABLE_PATH, size=LEMMA_TABLE_SIZE):
+    """Write the lemmas of the most common words in texts as a sorted lemma table."""
+    stop_words = get_stop_words()
+
+    # Tokenize exactly as preprocessing does so the table keys match request tokens
+    punctuation = str.maketrans("", "", string.punctuation)
+    counts = Counter()
+    for text in texts:
+        counts.update(w for w in (text or "").lower().translate(punctuation).split() if w not in stop_words)
+    words = [w for w, _ in counts.most_common(size)]
+
+    lemmatizer = get_lemmatizer()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        # Sorted by encoded bytes, the order LemmaTable.get bisects in
+        for word in sorted(w.encode("utf-8") for w in words):
+            lemma = lemmatizer.lemmatize(word.decode("utf-8")).encode("utf-8")
+            f.write(word + b"\t" + (b"" if lemma == word else lemma) + b"\n")
+    os.replace(tmp_path, path)
+    return len(words)
+
+
+# Rebuild the table from stored resumes plus any text files given:
+#   python -m utils.lemma_cache [file.txt ...]
+if __name__ == "__main__":
+    from models.resume_model import Resume
+
+    texts = [doc.get("resume_text", "") for doc in Resume.find_all_texts()]
+    for name in sys.argv[1:]:
+        with open(name, encoding="utf-8", errors="ignore") as f:
+            texts.append(f.read())
+    print(f"Wrote {build_lemma_table(texts)} lemmas to {LEMMA_TABLE_PATH}")
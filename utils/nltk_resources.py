@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# NLTK data ships with the app in this directory (or NLTK_DATA); nothing is downloaded at runtime
+NLTK_DATA_DIR = os.getenv(
+    "NLTK_DATA",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "nltk_data")
+)
+NLTK_PACKAGES = ["stopwords", "wordnet"]
+
+_stop_words = None
+_lemmatizer = None
+_lock = threading.Lock()
+
+
+def _nltk():
+    # nltk itself is imported on first use to keep it out of application import time
+    import nltk
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    return nltk
+
+
+def get_stop_words():
+    """English stopwords as a frozenset, loaded from local NLTK data on first use."""
+    global _stop_words
+    if _stop_words is None:
+        with _lock:
+            if _stop_words is None:
+                _nltk()
+                from nltk.corpus import stopwords
+                try:
+                    _stop_words = frozenset(stopwords.words("english"))
+                except LookupError:
+                    raise LookupError(
+                        f"NLTK stopwords not found in {NLTK_DATA_DIR}; "
+                        "run `python -m utils.nltk_resources` at build time"
+                    )
+    return _stop_words
+
+
+def get_lemmatizer():
+    """The shared WordNetLemmatizer, with WordNet resolved from local NLTK data."""
+    global _lemmatizer
+    if _lemmatizer is None:
+        with _lock:
+            if _lemmatizer is None:
+                _nltk()
+                from nltk.stem import WordNetLemmatizer
+                _lemmatizer = WordNetLemmatizer()
+    return _lemmatizer
+
+
+def preload_nltk_resources():
+    """
+    Load stopwords and WordNet eagerly, e.g. in the master process of a pre-fork
+    server so workers start with them in memory.
+    """
+    start_time = time.time()
+    get_stop_words()
+    from nltk.corpus import wordnet
+    try:
+        wordnet.ensure_loaded()
+    except LookupError:
+        raise LookupError(
+            f"NLTK wordnet not found in {NLTK_DATA_DIR}; "
+            "run `python -m utils.nltk_resources` at build time"
+        )
+    get_lemmatizer()
+    logger.info(f"NLTK resources loaded in {time.time() - start_time:.2f} seconds")
+
+
+# Build-time only: fetch the NLTK packages into the bundled data directory
+#   python -m utils.nltk_resources [target directory]
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else NLTK_DATA_DIR
+    nltk = _nltk()
+    for package in NLTK_PACKAGES:
+        nltk.download(package, download_dir=target)
@@ -0,0 +1,134 @@
+import re
+import json
+
+# Repairs for the ways model output most often breaks JSON
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_PYTHON_LITERALS = re.compile(r"\b(True|False|None)\b")
+_LITERAL_JSON = {"True": "true", "False": "false", "None": "null"}
+
+# Members dropped from the end of a truncated object before giving up
+_MAX_TRUNCATION_RETRIES = 8
+
+_BULLET = re.compile(r"^\s*(?:\d+[.)]|[*\-•])\s+(.*)$")
+_MARKDOWN = re.compile(r"[*_#`]+")
+
+
+def _scan_object(text, start):
+    """
+    Walk text from the '{' at start, tracking strings and nesting, and return
+    (end, closers): end is one past the matching '}' or None when the text runs out
+    first, closers what it would take to close what is still open.
+    """
+    stack = []
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return index + 1, ""
+    return None, ('"' if in_string else "") + "".join(reversed(stack))
+
+
+def _loads_repaired(candidate):
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        pass
+    candidate = candidate.translate(_SMART_QUOTES)
+    candidate = _PYTHON_LITERALS.sub(lambda m: _LITERAL_JSON[m.group(1)], candidate)
+    candidate = _TRAILING_COMMA.sub(r"\1", candidate)
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        return None
+
+
+def _close_truncated(fragment, closers):
+    """
+    Parse an object the output stopped in the middle of: close its open strings and
+    brackets, backing up to an earlier comma when the last member is incomplete.
+    """
+    for _ in range(_MAX_TRUNCATION_RETRIES):
+        data = _loads_repaired(fragment.rstrip().rstrip(",") + closers)
+        if isinstance(data, dict):
+            return data
+        cut = fragment.rfind(",")
+        if cut <= 0:
+            return None
+        fragment = fragment[:cut]
+        closers = _scan_object(fragment, 0)[1]
+    return None
+
+
+def extract_json_object(text):
+    """
+    The first JSON object embedded in a model response, or None. Tolerates code fences
+    and prose around the object, smart quotes, Python literals, trailing commas and
+    output cut off before the object was closed.
+    """
+    if not text:
+        return None
+    start = text.find("{")
+    while start >= 0:
+        end, closers = _scan_object(text, start)
+        if end is None:
+            return _close_truncated(text[start:], closers)
+        data = _loads_repaired(text[start:end])
+        if isinstance(data, dict):
+            return data
+        start = text.find("{", end)
+    return None
+
+
+def find_sections(text, headings):
+    """
+    Split a free-text response by heading phrases in one pass over its lines. headings
+    maps a phrase (lowercase) to a section name; a section is whatever follows the first
+    phrase for that name, on its line and the lines after, up to the next blank line.
+    Returns {name: [lines]}.
+    """
+    pattern = re.compile("|".join(re.escape(phrase) for phrase in sorted(headings, key=len, reverse=True)), re.IGNORECASE)
+    sections = {}
+    current = None
+    for line in text.splitlines():
+        match = pattern.search(line)
+        if match:
+            name = headings[match.group(0).lower()]
+            if name not in sections:
+                current = sections[name] = []
+                rest = line[match.end():].strip(" \t:*_#-")
+                if rest:
+                    current.append(rest)
+                continue
+        if not line.strip():
+            current = None
+        elif current is not None:
+            current.append(line)
+    return sections
+
+
+def bullet_items(lines):
+    """Text of the bulleted or numbered items among lines, markdown emphasis removed."""
+    items = []
+    for line in lines:
+        match = _BULLET.match(line)
+        if match:
+            item = _MARKDOWN.sub("", match.group(1)).strip()
+            if item:
+                items.append(item)
+    return items
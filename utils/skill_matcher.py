@@ -0,0 +1,181 @@
+import os
+import re
+import threading
+from collections import Counter, deque
+
+# Skill dictionary, one "canonical | alias ..." line per skill under [Category] headers
+SKILLS_PATH = os.getenv(
+    "SKILLS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "skills.txt")
+)
+
+# Resume section names and the heading phrases that open them
+SECTION_HEADINGS = {
+    "experience": ["experience", "work experience", "professional experience", "employment history", "work history"],
+    "education": ["education", "academic background", "educational qualifications", "qualifications"],
+    "skills": ["skills", "skill", "technical skills", "key skills", "core competencies"],
+    "projects": ["projects", "project", "personal projects", "academic projects", "key projects"],
+    "certifications": ["certifications", "certification", "certificates", "licenses"],
+    "achievements": ["achievements", "awards", "honors", "accomplishments"],
+    "summary": ["summary", "professional summary", "profile", "objective", "career objective"]
+}
+
+# Words keep inner ".", "/", "&", "-" and "+"/"#" so "node.js", "ci/cd", "c++" and "c#" are single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+(?:[./&-][a-z0-9+#]+)*")
+
+# A heading may be preceded on its line only by whitespace or bullet characters
+_LINE_PREFIX = re.compile(r"[ \t•●\-*#>|]*$")
+_MAX_HEADING_LINE = 40
+
+
+def tokenize(text):
+    """Yield (token, start, end) for every word of text, lowercased."""
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        yield match.group(), match.start(), match.end()
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over word tokens. Built once from a phrase -> label mapping,
+    it finds every phrase occurrence in a single linear pass over a text.
+    """
+
+    def __init__(self, phrases):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for phrase, label in phrases.items():
+            words = [token for token, _, _ in tokenize(phrase)]
+            if not words:
+                continue
+            state = 0
+            for word in words:
+                next_state = self._goto[state].get(word)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][word] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append((label, len(words)))
+
+        # Breadth-first failure links; each state also reports the matches of its fallback
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(word, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text):
+        """
+        Return (label, start, end) character spans of every phrase found in text, in order.
+        Phrases inside a longer match are dropped, so "react native" is not also
+        reported as "react".
+        """
+        matches = []
+        starts = []
+        state = 0
+        for token, start, end in tokenize(text):
+            starts.append(start)
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for label, length in self._output[state]:
+                matches.append((label, starts[-length], end))
+
+        matches.sort(key=lambda match: (match[1], -match[2]))
+        longest = []
+        covered_to = -1
+        for match in matches:
+            if match[2] > covered_to or (longest and match[1:] == longest[-1][1:]):
+                longest.append(match)
+                covered_to = max(covered_to, match[2])
+        return longest
+
+    def count(self, text):
+        return Counter(label for label, _, _ in self.find_all(text))
+
+
+def load_skills(path=SKILLS_PATH):
+    """Read the skill dictionary as a list of (canonical, aliases, category) entries."""
+    skills = []
+    category = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                category = line[1:-1]
+                continue
+            names = [name.strip().lower() for name in line.split("|") if name.strip()]
+            skills.append((names[0], names[1:], category))
+    return skills
+
+
+_skill_matcher = None
+_section_matcher = None
+_lock = threading.Lock()
+
+
+def get_skill_matcher():
+    """The compiled skill matcher, built from the dictionary on first use."""
+    global _skill_matcher
+    if _skill_matcher is None:
+        with _lock:
+            if _skill_matcher is None:
+                _skill_matcher = PhraseMatcher({
+                    name: canonical
+                    for canonical, aliases, _ in load_skills()
+                    for name in [canonical] + aliases
+                })
+    return _skill_matcher
+
+
+def get_section_matcher():
+    global _section_matcher
+    if _section_matcher is None:
+        with _lock:
+            if _section_matcher is None:
+                _section_matcher = PhraseMatcher({
+                    heading: section
+                    for section, headings in SECTION_HEADINGS.items()
+                    for heading in headings
+                })
+    return _section_matcher
+
+
+def find_skills(text):
+    """Count occurrences of every dictionary skill in text, keyed by canonical name."""
+    return get_skill_matcher().count(text or "")
+
+
+def find_section_mentions(text):
+    """Count mentions of each section's heading phrases anywhere in text."""
+    return get_section_matcher().count(text or "")
+
+
+def find_sections(text):
+    """Map each section to the (start, end) character span under its heading."""
+    text = text or ""
+    headings = []
+    for section, start, end in get_section_matcher().find_all(text):
+        line_start = text.rfind("\n", 0, start) + 1
+        line_end = text.find("\n", end)
+        line_end = len(text) if line_end < 0 else line_end
+        if _LINE_PREFIX.match(text, line_start, start) and line_end - line_start <= _MAX_HEADING_LINE:
+            if not headings or headings[-1][1] < line_start:
+                headings.append((section, line_start))
+
+    sections = {}
+    for i, (section, start) in enumerate(headings):
+        end = headings[i + 1][1] if i + 1 < len(headings) else len(text)
+        sections.setdefault(section, (start, end))
+    return sections
@@ -0,0 +1,149 @@
+import re
+import sys
+import time
+import string
+from array import array
+import numpy as np
+from scipy.sparse import csr_matrix
+from utils.lemma_cache import lemmatize
+from utils.nltk_resources import get_stop_words
+
+# The one text normalization used everywhere: lowercase, strip ASCII punctuation,
+# split on whitespace, drop stopwords, lemmatize
+PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+
+# What sklearn's CountVectorizer(stop_words="english") does to the normalized text
+_ATS_TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+def tokenize(text):
+    """Lowercased, punctuation-free whitespace tokens of text (stopwords included)."""
+    if not text or not text.strip():
+        return []
+    return text.lower().translate(PUNCTUATION_TABLE).split()
+
+
+def lemmatize_tokens(tokens):
+    """Lemmas of the non-stopword tokens, in order."""
+    stop_words = get_stop_words()
+    return [lemmatize(token) for token in tokens if token not in stop_words]
+
+
+def normalize(text):
+    """Canonical normalized words of text; " ".join() of this is the preprocessed text."""
+    return lemmatize_tokens(tokenize(text))
+
+
+class TextPipeline:
+    """
+    Batch normalization into token-ID arrays over an interned vocabulary. Each distinct
+    term is stored once, and per-term work (lemma lookup, ATS tokenization) is done once
+    per term rather than once per occurrence.
+    """
+
+    def __init__(self):
+        self.stop_words = get_stop_words()
+        self.terms = []     # term ID -> term
+        self.term_ids = {}  # term -> term ID
+        self._lemma_ids = {}  # raw token -> term ID of its lemma
+        self._ats_terms = {}  # term ID -> tuple of ATS vectorizer tokens
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _intern(self, term):
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            term_id = self.term_ids[term] = len(self.terms)
+            self.terms.append(sys.intern(term))
+        return term_id
+
+    def encode_lemmas(self, lemmas):
+        """Token-ID array of already normalized words."""
+        intern = self._intern
+        return array("I", [intern(lemma) for lemma in lemmas])
+
+    def encode(self, text):
+        """Token-ID array of the normalized words of text."""
+        ids = array("I")
+        lemma_ids = self._lemma_ids
+        stop_words = self.stop_words
+        for token in tokenize(text):
+            if token in stop_words:
+                continue
+            term_id = lemma_ids.get(token)
+            if term_id is None:
+                term_id = lemma_ids[token] = self._intern(lemmatize(token))
+            ids.append(term_id)
+        return ids
+
+    def encode_batch(self, texts):
+        return [self.encode(text) for text in texts]
+
+    def decode(self, ids):
+        """The preprocessed text of a token-ID array."""
+        return " ".join(self.terms[term_id] for term_id in ids)
+
+    def count_matrix(self, encoded):
+        """Documents x vocabulary sparse term-count matrix of token-ID arrays."""
+        rows = np.repeat(np.arange(len(encoded)), [len(ids) for ids in encoded])
+        cols = np.concatenate([np.asarray(ids, dtype=np.uint32) for ids in encoded]) if encoded else []
+        data = np.ones(len(rows), dtype=np.float64)
+        return csr_matrix((data, (rows, cols)), shape=(len(encoded), len(self.terms)))
+
+    def ats_count_matrix(self, encoded):
+        """
+        The term counts CountVectorizer(stop_words="english").fit_transform would give
+        for the decoded texts, with its alphabetically sorted vocabulary, built without
+        re-tokenizing the text. Returns (matrix, feature names).
+        """
+        from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+        for term_id in range(len(self._ats_terms), len(self.terms)):
+            self._ats_terms[term_id] = tuple(
+                token for token in _ATS_TOKEN_PATTERN.findall(self.terms[term_id])
+                if token not in ENGLISH_STOP_WORDS
+            )
+
+        features = sorted({token for tokens in self._ats_terms.values() for token in tokens})
+        columns = {feature: column for column, feature in enumerate(features)}
+        # Term ID -> ATS column IDs, so each document row is built from its term IDs alone
+        term_columns = [tuple(columns[token] for token in self._ats_terms[term_id]) for term_id in range(len(self.terms))]
+
+        rows, cols = [], []
+        for row, ids in enumerate(encoded):
+            for term_id in ids:
+                for column in term_columns[term_id]:
+                    rows.append(row)
+                    cols.append(column)
+        data = np.ones(len(rows), dtype=np.float64)
+        matrix = csr_matrix((data, (rows, cols)), shape=(len(encoded), len(features)))
+        matrix.sum_duplicates()
+        return matrix, features
+
+
+# Throughput benchmark on synthetic resumes:
+#   python -m utils.text_pipeline [documents]
+if __name__ == "__main__":
+    from utils.keyword_extractor import preprocess_text
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    words = ("python developer experienced building scalable microservices, REST APIs and data "
+             "pipelines; led teams, mentored engineers and shipped machine-learning models to "
+             "production using Docker, Kubernetes and AWS. ").split()
+    documents = [" ".join(words[(i + j) % len(words)] for j in range(600)) + f" project{i}" for i in range(count)]
+
+    start_time = time.perf_counter()
+    for document in documents:
+        preprocess_text(document)
+    per_document = time.perf_counter() - start_time
+
+    pipeline = TextPipeline()
+    start_time = time.perf_counter()
+    encoded = pipeline.encode_batch(documents)
+    pipeline.ats_count_matrix(encoded)
+    batch = time.perf_counter() - start_time
+
+    print(f"{count} documents, {sum(len(ids) for ids in encoded)} tokens, {len(pipeline)} terms")
+    print(f"preprocess_text per document: {per_document:.2f}s ({count / per_document:.0f} docs/s)")
+    print(f"TextPipeline batch + counts:  {batch:.2f}s ({count / batch:.0f} docs/s)")